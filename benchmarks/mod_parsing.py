@@ -0,0 +1,92 @@
+# SPDX-FileCopyrightText: 2025 Poirazi Lab <dendrotweaks@dendrites.gr>
+# SPDX-License-Identifier: MPL-2.0
+
+"""
+Benchmark the parsing of the MOD files shipped with the examples.
+
+Each file in ``examples/*/biophys/mod`` is read, split into blocks and
+parsed several times. The best time for each file is reported together
+with the total. Files with KINETIC blocks are skipped as they are not
+supported by the parser.
+
+Usage
+-----
+    python benchmarks/mod_parsing.py [--repeat N] [--max-total SECONDS]
+
+If ``--max-total`` is given, the script exits with a non-zero status
+when the total parse time exceeds it, so that it can be used to catch
+performance regressions.
+"""
+
+import os
+import sys
+import glob
+import time
+import argparse
+
+from dendrotweaks.biophys.io import MODFileReader, MODFileParser
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            '..', 'examples')
+
+
+def read_blocks(path_to_mod_file):
+    """
+    Read a MOD file and split it into blocks.
+    """
+    reader = MODFileReader()
+    reader.read_file(path_to_mod_file)
+    reader.preprocess()
+    return reader.get_blocks(verbose=False)
+
+
+def time_parsing(blocks, repeat):
+    """
+    Get the best time to parse and postprocess the blocks of a MOD file.
+    """
+    times = []
+    for _ in range(repeat):
+        parser = MODFileParser()
+        start = time.perf_counter()
+        parser.parse(blocks, verbose=False)
+        parser.postprocess()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().split('\n\n')[0])
+    arg_parser.add_argument('--repeat', type=int, default=3,
+                            help='Number of times to parse each file.')
+    arg_parser.add_argument('--max-total', type=float, default=None,
+                            help='Fail if the total parse time exceeds this value (s).')
+    args = arg_parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(EXAMPLES_DIR, '*', 'biophys', 'mod', '*.mod')))
+    if not paths:
+        sys.exit(f'No MOD files found in {os.path.abspath(EXAMPLES_DIR)}')
+
+    # The grammar is built on the first parse
+    start = time.perf_counter()
+    MODFileParser().parse({'TITLE': ['TITLE warm-up']}, verbose=False)
+    print(f"{'Building the grammar':<40} {time.perf_counter() - start:8.4f} s")
+
+    total = 0
+    for path in paths:
+        name = os.path.relpath(path, EXAMPLES_DIR).replace(
+            os.path.join('biophys', 'mod') + os.sep, '')
+        blocks = read_blocks(path)
+        if blocks.get('KINETIC'):
+            print(f'{name:<40} {"skipped (KINETIC)":>10}')
+            continue
+        elapsed = time_parsing(blocks, args.repeat)
+        total += elapsed
+        print(f'{name:<40} {elapsed:8.4f} s')
+    print(f"{'Total':<40} {total:8.4f} s")
+
+    if args.max_total is not None and total > args.max_total:
+        sys.exit(f'Total parse time {total:.4f} s exceeds {args.max_total} s')
+
+
+if __name__ == '__main__':
+    main()
@@ -31,8 +31,8 @@ def get_somatic_data(model):
     seg = soma(0.5)
     iclamp = model.iclamps[seg]
 
-    v = np.array(model.simulator.recordings['v'][seg])
-    t = np.array(model.simulator.t)
+    v = np.asarray(model.simulator.recordings['v'][seg])
+    t = np.asarray(model.simulator.t)
     dt = model.simulator.dt
 
     return v, t, dt, iclamp
@@ -191,10 +191,23 @@ def detect_somatic_spikes(model, **kwargs):
     soma = model.sec_tree.root
     seg = soma(0.5)
             
-    v = np.array(model.simulator.recordings['v'][seg])
-    t = np.array(model.simulator.t)
+    v = model.simulator.recordings['v'][seg]
+    t = model.simulator.t
     dt = model.simulator.dt
 
+    return {
+        **_detect_spikes(v, t, dt, **kwargs),
+        'stimulus_duration': model.iclamps[seg].dur
+    }
+
+
+def _detect_spikes(v, t, dt, **kwargs):
+    """
+    Detect spikes in a voltage trace and calculate spike amplitudes and widths.
+    """
+    v = np.asarray(v)
+    t = np.asarray(t)
+
     baseline = np.median(v)
     height = kwargs.get('height', baseline)
     distance = kwargs.get('distance', int(2/dt))
@@ -214,7 +227,6 @@ def detect_somatic_spikes(model, **kwargs):
         'amplitudes': properties['prominences'],
         'left_bases': left_bases,
         'right_bases': right_bases,
-        'stimulus_duration': model.iclamps[seg].dur
     }
 
 
@@ -260,7 +272,7 @@ def plot_somatic_spikes(data, ax=None, show_metrics=False):
             ax.plot([t - 10*w/2, t + 10*w/2], [v - a/2, v - a/2], color='lawngreen', linestyle='--')
 
 
-def calculate_fI_curve(model, duration=1000, prerun_time=0, min_amp=0, max_amp=1, n=5, **kwargs):
+def calculate_fI_curve(model, duration=1000, prerun_time=0, min_amp=0, max_amp=1, n=5, n_workers=None, **kwargs):
     """
     Calculate the frequency-current (f-I) curve of the neuron model.
 
@@ -276,6 +288,9 @@ def calculate_fI_curve(model, duration=1000, prerun_time=0, min_amp=0, max_amp=1
         Maximum amplitude of the current injection in nA.
     n : int
         Number of amplitudes to test.
+    n_workers : int, optional
+        If given, run the amplitudes in parallel in this number
+        of processes (see `Model.sweep`). Default is None (sequential).
 
     Returns
     -------
@@ -288,22 +303,37 @@ def calculate_fI_curve(model, duration=1000, prerun_time=0, min_amp=0, max_amp=1
     
     amps = np.round(np.linspace(min_amp, max_amp, n), 4)
     iclamp = model.iclamps[seg]
+
+    if n_workers is None:
+        results = []
+        for amp in amps:
+            iclamp.amp = amp
+            model.run(duration=duration, prerun_time=prerun_time, 
+                      reuse_prerun=prerun_time > 0)
+            results.append({
+                'time': model.simulator.t,
+                'recordings': model.simulator.recordings
+            })
+    else:
+        conditions = [{'iclamps': {seg: {'amp': amp}}} for amp in amps]
+        results = model.sweep(conditions, duration=duration, 
+                              prerun_time=prerun_time, n_workers=n_workers)
+
     rates = []
     vs = {}
-    for amp in amps:
-        iclamp.amp = amp
-        model.run(duration=duration, prerun_time=prerun_time)
-        spike_data = detect_somatic_spikes(model, **kwargs)
+    for amp, result in zip(amps, results):
+        v = result['recordings']['v'][seg]
+        spike_data = _detect_spikes(v, result['time'], model.simulator.dt, **kwargs)
         n_spikes = len(spike_data['spike_times'])
         rate = n_spikes / iclamp.dur * 1000
         rates.append(rate)
-        vs[amp] = model.simulator.recordings['v'][seg]
+        vs[amp] = v
 
     return {
         'current_amplitudes': amps,
         'firing_rates': rates,
         'voltages': vs,
-        'time': model.simulator.t
+        'time': results[-1]['time']
     }
 
 
@@ -394,8 +424,8 @@ def calculate_voltage_attenuation(model):
     start_ts = int(iclamp.delay / model.simulator.dt)
     stop_ts = int((iclamp.delay + iclamp.dur) / model.simulator.dt)
 
-    voltage_at_stimulated = np.array(model.simulator.recordings['v'][stimulated_seg])[start_ts:stop_ts]
-    voltages = [np.array(model.simulator.recordings['v'][seg])[start_ts:stop_ts] for seg in recorded_segs]
+    voltage_at_stimulated = np.asarray(model.simulator.recordings['v'][stimulated_seg])[start_ts:stop_ts]
+    voltages = [np.asarray(model.simulator.recordings['v'][seg])[start_ts:stop_ts] for seg in recorded_segs]
 
 
     # Calculate voltage displacement from the resting potential
@@ -429,7 +459,7 @@ def plot_voltage_attenuation(data, ax=None):
     ax.set_ylabel('Voltage attenuation')
     ax.set_title('Voltage attenuation')
 
-def calculate_dendritic_nonlinearity(model, duration=1000, prerun_time=0, max_weight=None, n=None):
+def calculate_dendritic_nonlinearity(model, duration=1000, prerun_time=0, max_weight=None, n=None, n_workers=None):
     """Calculate the expected and observed voltage changes for a range of synaptic weights.
 
     Parameters
@@ -440,6 +470,9 @@ def calculate_dendritic_nonlinearity(model, duration=1000, prerun_time=0, max_we
         Duration of the simulation in ms.
     max_weight : int
         Maximum synaptic weight to test.
+    n_workers : int, optional
+        If given, run the weights in parallel in this number
+        of processes (see `Model.sweep`). Default is None (sequential).
 
     Returns
     -------
@@ -450,11 +483,11 @@ def calculate_dendritic_nonlinearity(model, duration=1000, prerun_time=0, max_we
     recorded_segs = list(model.recordings['v'].keys())
     seg = recorded_segs[0]
 
-    populations = list(model.populations.values())
+    populations = list(model.populations.items())
     if len(populations) != 1:
         print("Only one population is supported")
         return None
-    population = populations[0]
+    pop_name, population = populations[0]
     if population.N != 1:
         print("Only one synapse should be placed on the dendrite")
         return None
@@ -471,10 +504,23 @@ def calculate_dendritic_nonlinearity(model, duration=1000, prerun_time=0, max_we
     weights = np.linspace(min_weight, max_weight, n, dtype=int)
     weights = np.unique(weights)
 
-    for w in weights:
-        population.update_input_params(weight=w)
-        model.run(duration=duration, prerun_time=prerun_time)
-        v = np.array(model.simulator.recordings['v'][seg])
+    if n_workers is None:
+        results = []
+        for w in weights:
+            population.update_input_params(weight=w)
+            model.run(duration=duration, prerun_time=prerun_time, 
+                      reuse_prerun=prerun_time > 0)
+            results.append({
+                'time': model.simulator.t,
+                'recordings': model.simulator.recordings
+            })
+    else:
+        conditions = [{'populations': {pop_name: {'weight': w}}} for w in weights]
+        results = model.sweep(conditions, duration=duration, 
+                              prerun_time=prerun_time, n_workers=n_workers)
+
+    for w, result in zip(weights, results):
+        v = np.asarray(result['recordings']['v'][seg])
         v_start = v[start_ts]
         v_max = np.max(v[start_ts:])
         delta_v = v_max - v_start
@@ -488,7 +534,7 @@ def calculate_dendritic_nonlinearity(model, duration=1000, prerun_time=0, max_we
         'observed_response': delta_vs,
         'voltages': vs,
         'weights': weights,
-        'time': model.simulator.t
+        'time': results[-1]['time']
     }
 
 
@@ -106,26 +106,99 @@ def update_histogram(model, param_name, segments, **kwargs):
     hist, edges = np.histogram(values, **kwargs)
     return hist, edges
 
-def calculate_pairwise_synaptic_distances(synapses):
+def calculate_pairwise_synaptic_distances(synapses, output='square', 
+                                          max_distance=None, block_size=1024):
     """
     Calculates the pairwise distances between synapses based on their locations on the morphology.
+
+    The distances are computed block by block for the upper triangle only,
+    with the lowest common ancestors found once per pair of sections 
+    in each block rather than per pair of synapses.
+
     Parameters
     ----------
     synapses : list[Synapse]
         A list of Synapse objects.
+    output : str, optional
+        The format of the result. Can be:
+        - 'square': a dense (N, N) matrix (default).
+        - 'condensed': a vector of length N * (N - 1) / 2 with the upper 
+          triangle of the matrix in row-major order, as in scipy.spatial.distance.
+        - 'sparse': a symmetric scipy.sparse.csr_matrix containing only the 
+          distances that do not exceed `max_distance`.
+    max_distance : float, optional
+        The maximum distance to keep. Required if `output` is 'sparse'.
+    block_size : int, optional
+        The number of rows computed at once. Limits the size of 
+        intermediate arrays. Default is 1024.
+
     Returns
     -------
-    np.ndarray
-        A 2D array of shape (N, N) where N is the number of synapses, containing the pairwise distances.
+    np.ndarray or scipy.sparse.csr_matrix
+        The pairwise distances in the requested format.
     """
-    pairwise_distances_matrix = np.zeros((len(synapses), len(synapses)))
-    for i, syn1 in enumerate(synapses):
-        for j, syn2 in enumerate(synapses):
-            if syn1 != syn2:
-                dist = syn1.sec.path_distance(
-                    other=syn2.sec,
-                    relative_position=syn1.loc,
-                    relative_position_other=syn2.loc
-                )
-                pairwise_distances_matrix[i, j] = dist
-    return pairwise_distances_matrix
\ No newline at end of file
+    if output not in ('square', 'condensed', 'sparse'):
+        raise ValueError(f"Invalid output format: {output}. Use 'square', 'condensed' or 'sparse'.")
+    if output == 'sparse' and max_distance is None:
+        raise ValueError("max_distance must be provided for the 'sparse' output.")
+
+    n = len(synapses)
+    if output == 'square':
+        result = np.zeros((n, n))
+    elif output == 'condensed':
+        result = np.zeros(n * (n - 1) // 2)
+    else:
+        rows, cols, values = [], [], []
+
+    if n > 1:
+        sec_tree = synapses[0].sec._tree
+        # Group synapses by section
+        sections = list(dict.fromkeys(syn.sec for syn in synapses))
+        sec_ids = {sec: i for i, sec in enumerate(sections)}
+        syn_sec_ids = np.array([sec_ids[syn.sec] for syn in synapses], dtype=int)
+        locs = np.array([syn.loc for syn in synapses], dtype=float)
+
+        sec_positions = sec_tree._get_positions(sections)
+        syn_positions = sec_positions[syn_sec_ids]
+
+        for start in range(0, n - 1, block_size):
+            stop = min(start + block_size, n - 1)
+            i = np.arange(start, stop)
+            j = np.arange(start + 1, n)
+            # Only the sections of the block are needed to keep memory bounded
+            row_secs, row_inv = np.unique(syn_sec_ids[i], return_inverse=True)
+            col_secs, col_inv = np.unique(syn_sec_ids[j], return_inverse=True)
+            sec_ancestors = sec_tree._lowest_common_ancestor_positions(
+                sec_positions[row_secs][:, None], sec_positions[col_secs][None, :]
+            )
+            distances = sec_tree._path_distances_via_ancestors(
+                syn_positions[i][:, None], locs[i][:, None],
+                syn_positions[j][None, :], locs[j][None, :],
+                sec_ancestors[np.ix_(row_inv, col_inv)]
+            )
+            upper = j[None, :] > i[:, None]
+
+            if output == 'square':
+                block = np.where(upper, distances, 0)
+                result[start:stop, start + 1:] = block
+                result[start + 1:, start:stop] += block.T
+            elif output == 'condensed':
+                for k, row in enumerate(i):
+                    offset = row * n - row * (row + 1) // 2
+                    result[offset:offset + n - row - 1] = distances[k, row - start:]
+            else:
+                mask = upper & (distances <= max_distance)
+                row_idx, col_idx = np.nonzero(mask)
+                rows.append(i[row_idx])
+                cols.append(j[col_idx])
+                values.append(distances[mask])
+
+    if output != 'sparse':
+        return result
+
+    from scipy.sparse import coo_matrix
+    rows = np.concatenate(rows) if rows else np.array([], dtype=int)
+    cols = np.concatenate(cols) if cols else np.array([], dtype=int)
+    values = np.concatenate(values) if values else np.array([])
+    upper_triangle = coo_matrix((values, (rows, cols)), shape=(n, n))
+    return (upper_triangle + upper_triangle.T).tocsr()
\ No newline at end of file
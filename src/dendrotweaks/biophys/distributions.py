@@ -2,7 +2,7 @@
 # SPDX-License-Identifier: MPL-2.0
 
 from typing import Callable, Dict, List
-from numpy import  ndarray, full_like
+from numpy import  ndarray, full_like, where
 from numpy import exp, sin, polyval
 import warnings
 # Define simple functions and store them alongside their defaults in FUNCTIONS
@@ -172,6 +172,8 @@ def step(distance: float, start: float, end: float, min_value: float, max_value:
     Returns:
         The result of the step equation: min_value if distance < start, max_value if distance > end, and a linear interpolation between min_value and max_value if start <= distance <= end.
     """
+    if isinstance(distance, ndarray):
+        return where((start < distance) & (distance < end), max_value, min_value).astype(float)
     if start < distance < end:
         return max_value
     else:
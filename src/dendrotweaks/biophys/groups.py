@@ -3,6 +3,8 @@
 
 from typing import List, Callable, Dict
 
+import numpy as np
+
 from dendrotweaks.utils import timeit
 from dataclasses import dataclass, field, asdict
 from typing import List, Tuple, Dict, Optional
@@ -72,6 +74,43 @@ class SegmentGroup:
             (self.max_value is None or segment_value <= self.max_value)
         )
 
+    def _get_segment_values(self, seg_tree) -> Optional[np.ndarray]:
+        if self.select_by == 'diam':
+            return np.array([seg.diam for seg in seg_tree.segments], dtype=float)
+        elif self.select_by == 'section_diam':
+            return np.array([seg._section._ref.diam for seg in seg_tree.segments], dtype=float)
+        elif self.select_by == 'distance':
+            return seg_tree.path_distances()
+        elif self.select_by == 'domain_distance':
+            return seg_tree.path_distances(within_domain=True)
+        return None
+
+    def get_indices(self, seg_tree) -> np.ndarray:
+        """
+        Get the indices of the segments in a segment tree that belong to the group.
+        Equivalent to testing `segment in group` for every segment, but 
+        the property values are compared for all segments at once.
+
+        Parameters
+        ----------
+        seg_tree : SegmentTree
+            The segment tree to select the segments from.
+
+        Returns
+        -------
+        np.ndarray
+            The indices of the segments in the group.
+        """
+        mask = np.array([seg.domain_name in self.domains 
+                         for seg in seg_tree.segments], dtype=bool)
+        if self.select_by is not None:
+            segment_values = self._get_segment_values(seg_tree)
+            if self.min_value is not None:
+                mask &= segment_values > self.min_value
+            if self.max_value is not None:
+                mask &= segment_values <= self.max_value
+        return np.flatnonzero(mask)
+
     def __repr__(self):
         filters = (
             f"{self.select_by}({self.min_value}, {self.max_value})"
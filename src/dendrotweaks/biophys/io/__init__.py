@@ -9,6 +9,10 @@ from dendrotweaks.biophys.io.parser import MODFileParser
 from dendrotweaks.biophys.io.code_generators import PythonCodeGenerator
 from dendrotweaks.biophys.io.code_generators import NMODLCodeGenerator
 
+from dendrotweaks.biophys.io.cache import get_channel_cache_key
+from dendrotweaks.biophys.io.cache import save_channel_cache
+from dendrotweaks.biophys.io.cache import load_channel_cache
+
 from dendrotweaks.biophys.io.factories import create_channel
 from dendrotweaks.biophys.io.factories import create_standard_channel
 from dendrotweaks.biophys.io.factories import standardize_channel
\ No newline at end of file
@@ -0,0 +1,100 @@
+# SPDX-FileCopyrightText: 2025 Poirazi Lab <dendrotweaks@dendrites.gr>
+# SPDX-License-Identifier: MPL-2.0
+
+"""
+On-disk cache of MOD files converted to Python.
+
+The cache holds the abstract syntax tree of a MOD file together with
+the Python code generated from it, so that a channel can be created
+without parsing the MOD file again as long as neither the MOD file
+nor the template has changed.
+"""
+
+import os
+import json
+import hashlib
+import warnings
+
+from dendrotweaks import __version__
+
+# Increase when the layout of the cache or the conversion changes
+CACHE_VERSION = 1
+
+
+def get_channel_cache_key(path_to_mod_file: str,
+                          path_to_python_template: str) -> str:
+    """
+    Get the key of the cached conversion of a MOD file.
+
+    Parameters
+    ----------
+    path_to_mod_file : str
+        The path to the MOD file.
+    path_to_python_template : str
+        The path to the jinja2 template file for the Python file.
+
+    Returns
+    -------
+    str
+        A hash of the content of the MOD file and the template.
+    """
+    sha = hashlib.sha256()
+    sha.update(f'{CACHE_VERSION}:{__version__}'.encode())
+    for path in (path_to_mod_file, path_to_python_template):
+        with open(path, 'rb') as f:
+            content = f.read()
+        sha.update(hashlib.sha256(content).digest())
+    return sha.hexdigest()
+
+
+def save_channel_cache(path_to_cache: str, key: str,
+                       ast: dict, content: str) -> None:
+    """
+    Save the AST and the generated Python code of a channel to a JSON file.
+
+    Parameters
+    ----------
+    path_to_cache : str
+        The path to the JSON file.
+    key : str
+        The key of the cache (see `get_channel_cache_key`).
+    ast : dict
+        The postprocessed AST of the MOD file.
+    content : str
+        The generated Python code.
+    """
+    os.makedirs(os.path.dirname(path_to_cache), exist_ok=True)
+    tmp_path = f'{path_to_cache}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'key': key, 'ast': ast, 'content': content}, f)
+    os.replace(tmp_path, path_to_cache)
+
+
+def load_channel_cache(path_to_cache: str, key: str):
+    """
+    Load the AST and the generated Python code of a channel from a JSON file.
+
+    Parameters
+    ----------
+    path_to_cache : str
+        The path to the JSON file.
+    key : str
+        The expected key of the cache (see `get_channel_cache_key`).
+
+    Returns
+    -------
+    dict or None
+        A dictionary with the 'ast' and the 'content' of the Python file,
+        or None if the cache does not exist or is outdated.
+    """
+    if not os.path.exists(path_to_cache):
+        return None
+    try:
+        with open(path_to_cache, 'r') as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        warnings.warn(f'Could not read the channel cache {path_to_cache}: {e}')
+        return None
+    if not isinstance(data, dict) or data.get('key') != key:
+        return None
+    return data
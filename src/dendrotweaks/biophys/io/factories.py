@@ -3,18 +3,23 @@
 
 import os
 import sys
+import warnings
 from typing import List, Tuple
 
 
 from dendrotweaks.biophys.io.converter import MODFileConverter
+from dendrotweaks.biophys.io.cache import get_channel_cache_key
+from dendrotweaks.biophys.io.cache import save_channel_cache, load_channel_cache
 from dendrotweaks.biophys.io.code_generators import NMODLCodeGenerator
 from dendrotweaks.biophys.mechanisms import Mechanism, IonChannel, StandardIonChannel
+from dendrotweaks.utils import write_file
 
 
 def create_channel(path_to_mod_file: str,
                    path_to_python_file: str,
                    path_to_python_template: str,
-                   verbose: bool = False) -> IonChannel:
+                   verbose: bool = False,
+                   path_to_cache: str = None) -> IonChannel:
     """
     Creates an ion channel from a .mod file.
 
@@ -28,18 +33,38 @@ def create_channel(path_to_mod_file: str,
         The path to the jinja2 template file for the Python file.
     verbose : bool, optional
         Whether to print verbose output.
+    path_to_cache : str, optional
+        The path to the JSON file caching the conversion. If the 
+        MOD file and the template have not changed since the cache
+        was written, the MOD file is not parsed again.
 
     Returns
     -------
     IonChannel
         The instantiated ion channel.
     """
-    # Convert mod to python
-    converter = MODFileConverter()
-    converter.convert(path_to_mod_file, 
-                      path_to_python_file, 
-                      path_to_python_template,
-                      verbose=verbose)
+    cached = None
+    if path_to_cache:
+        cache_key = get_channel_cache_key(path_to_mod_file, path_to_python_template)
+        cached = load_channel_cache(path_to_cache, cache_key)
+
+    if cached is not None:
+        if verbose: print(f"Using cached conversion of {path_to_mod_file}")
+        _write_if_changed(cached['content'], path_to_python_file)
+    else:
+        # Convert mod to python
+        converter = MODFileConverter()
+        converter.convert(path_to_mod_file, 
+                          path_to_python_file, 
+                          path_to_python_template,
+                          verbose=verbose)
+        if path_to_cache:
+            try:
+                save_channel_cache(path_to_cache, cache_key,
+                                   converter.parser._ast,
+                                   converter.generator.content)
+            except OSError as e:
+                warnings.warn(f'Could not cache the conversion of {path_to_mod_file}: {e}')
 
     # Import and instantiate the channel
     class_name = os.path.basename(path_to_python_file).replace('.py', '')
@@ -57,6 +82,17 @@ def create_channel(path_to_mod_file: str,
     return ChannelClass()
 
 
+def _write_if_changed(content: str, path_to_file: str) -> None:
+    """
+    Write the content to a file unless the file already has this content.
+    """
+    if os.path.exists(path_to_file):
+        with open(path_to_file, 'r') as f:
+            if f.read() == content:
+                return
+    write_file(content, path_to_file)
+
+
 def standardize_channel(channel: IonChannel, 
                         path_to_mod_template: str = None,
                         path_to_standard_mod_file: str = None) -> StandardIonChannel:
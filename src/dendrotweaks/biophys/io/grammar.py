@@ -3,11 +3,14 @@
 
 import pyparsing as pp
 
+# The expression grammar below does not backtrack over nested expressions,
+# so packrat parsing is only a safeguard here. The default bounded cache is
+# kept: larger caches only add overhead. The grammar itself is built once,
+# when the first MOD file is parsed (see `parser.get_block_grammars`).
 pp.ParserElement.enablePackrat()
 
 from pyparsing import (alphas, alphanums, nums)
 from pyparsing import (Char, Word, Empty, Literal, Regex, Keyword)
-from pyparsing import (infix_notation, opAssoc)
 
 from pyparsing import (Group, Combine, Dict, Suppress, delimitedList, Optional)
 from pyparsing import (ZeroOrMore, OneOrMore, oneOf)
@@ -15,7 +18,7 @@ from pyparsing import Forward
 from pyparsing import (restOfLine, SkipTo)
 from pyparsing import pyparsing_common
 from pyparsing import LineEnd
-from pyparsing import infixNotation, opAssoc, And
+from pyparsing import And
 from pyparsing import NotAny
 
 # Symbols
@@ -261,8 +264,12 @@ func_call_with_expr.setParseAction(func_call_with_expr_action)
 
 ## Operands
 func_operand = func_call_with_args | func_call_with_expr
-operand = func_operand | quantity | number | identifier # the order is important!
-operand = operand | LPAREN + operand + RPAREN
+simple_operand = quantity | number | identifier
+operand = func_operand | simple_operand # the order is important!
+# Only simple operands are matched in parentheses here (e.g. signed numbers
+# like "(-5)"). Any other parenthesized expression is matched once as
+# a primary expression instead of being parsed again on each level of nesting.
+operand = operand | LPAREN + simple_operand + RPAREN
 
 ## Operators
 signop = Literal('-')
@@ -289,17 +296,37 @@ def op_action(tokens):
         tokens = [{tokens[1]: [tokens[0], tokens[2]]}] + tokens[3:]
     return {tokens[1]: [tokens[0], tokens[2]]}
 
+def level_action(tokens):
+    if len(tokens[0]) == 1:
+        return tokens[0][0]
+    return op_action(tokens)
+
 ## Expression
-expr <<= infix_notation(
- operand,
- [
-  (signop, 1, opAssoc.RIGHT, sign_action),
-  (powop, 2, opAssoc.RIGHT, op_action),
-  (mulop, 2, opAssoc.LEFT, op_action),
-  (plusop, 2, opAssoc.LEFT, op_action),
-  (orderop, 2, opAssoc.LEFT, op_action),
- ]
-)
+# The levels of precedence are equivalent to
+# infix_notation(operand, [
+#   (signop, 1, opAssoc.RIGHT, sign_action),
+#   (powop, 2, opAssoc.RIGHT, op_action),
+#   (mulop, 2, opAssoc.LEFT, op_action),
+#   (plusop, 2, opAssoc.LEFT, op_action),
+#   (orderop, 2, opAssoc.LEFT, op_action),
+# ])
+# but each level matches its operands only once and does not look ahead,
+# so that the parsing time grows linearly with the nesting of expressions.
+primary = operand | LPAREN + expr + RPAREN
+
+sign_expr = Forward()
+sign_expr <<= Group(signop + sign_expr).setParseAction(sign_action) | primary
+
+pow_expr = Forward()
+pow_expr <<= Group(sign_expr + Optional(powop + pow_expr)).setParseAction(level_action)
+
+mul_expr = Group(pow_expr + ZeroOrMore(mulop + pow_expr)).setParseAction(level_action)
+plus_expr = Group(mul_expr + ZeroOrMore(plusop + mul_expr)).setParseAction(level_action)
+order_expr = Group(plus_expr + ZeroOrMore(orderop + plus_expr)).setParseAction(level_action)
+
+# The expression is a single token, not a list, when it has a results name
+order_expr.saveAsList = False
+expr <<= order_expr
 
 
 # expr = expr | LPAREN + expr + RPAREN
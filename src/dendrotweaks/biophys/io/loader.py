@@ -3,17 +3,67 @@
 
 import os
 import sys
+import json
 import shutil
+import hashlib
+import platform
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 import neuron
 from neuron import h
 
+# Environment variables that change the compiled mechanisms
+COMPILER_ENV_VARS = ['CC', 'CXX', 'CFLAGS', 'CXXFLAGS', 'LDFLAGS', 'NRNIVMODL_FLAGS']
+
+
+def get_build_cache_dir() -> str:
+    """
+    Get the directory where the compiled mechanisms are cached.
+
+    The directory can be set with the `DENDROTWEAKS_CACHE_DIR` environment
+    variable and defaults to `dendrotweaks/mechanisms` in the user cache folder.
+
+    Returns
+    -------
+    str
+        The path to the cache directory.
+    """
+    cache_dir = os.environ.get('DENDROTWEAKS_CACHE_DIR')
+    if cache_dir is None:
+        cache_root = os.environ.get('XDG_CACHE_HOME') or os.path.join(
+            os.path.expanduser('~'), '.cache')
+        cache_dir = os.path.join(cache_root, 'dendrotweaks')
+    return os.path.join(cache_dir, 'mechanisms')
+
 
 class MODFileLoader():
+    """
+    Compile MOD files and load them into NEURON.
+
+    Compiled mechanisms are cached by content: the build directory
+    of a mechanism is named after a hash of its MOD file, the NEURON
+    version, the platform and the compiler settings. A mechanism is
+    only compiled when no build exists for its hash, so compiled
+    libraries are reused across models and sessions.
 
-    def __init__(self):
-        self._loaded_mechanisms = set()
+    Parameters
+    ----------
+    cache_dir : str, optional
+        The directory to cache the compiled mechanisms in.
+        If None, `get_build_cache_dir` is used.
+
+    Attributes
+    ----------
+    _loaded_mechanisms : dict[str, str]
+        The loaded mechanisms mapped to the directory of the 
+        library they were loaded from (None if the mechanism 
+        was already available in NEURON).
+    """
+
+    def __init__(self, cache_dir=None):
+        self._loaded_mechanisms = {}
         self.verbose = False
+        self.cache_dir = cache_dir or get_build_cache_dir()
 
     def _log(self, message):
         """Print a message if verbose mode is enabled."""
@@ -22,9 +72,46 @@ class MODFileLoader():
               
     # LOADING METHODS
 
+    @property
+    def _compile_command(self):
+        if sys.platform.startswith('win'):
+            return ["mknrndll"]
+        return ["nrnivmodl"]
+
+
+    def _get_build_hash(self, path_to_mod_file: str) -> str:
+        """
+        Get the hash that identifies the build of a mod file.
+
+        Parameters
+        ----------
+        path_to_mod_file : str
+            Path to the .mod file.
+
+        Returns
+        -------
+        str
+            A hash of the content of the mod file, the NEURON version,
+            the platform and the compiler settings.
+        """
+        sha = hashlib.sha256()
+        with open(path_to_mod_file, 'rb') as f:
+            sha.update(f.read())
+        build_settings = {
+            'neuron': neuron.__version__,
+            'platform': sys.platform,
+            'machine': platform.machine(),
+            'python': platform.python_version(),
+            'command': self._compile_command,
+            'env': {var: os.environ.get(var, '') for var in COMPILER_ENV_VARS},
+        }
+        sha.update(json.dumps(build_settings, sort_keys=True).encode())
+        return sha.hexdigest()[:16]
+
+
     def _get_mechanism_dir(self, path_to_mod_file: str) -> str:
         """
-        Get the subdirectory for the given mod file.
+        Get the build directory for the given mod file in the cache.
 
         Parameters
         ----------
@@ -34,14 +121,38 @@ class MODFileLoader():
         Returns
         -------
         str
-            Path to the subdirectory for the mechanism.
+            Path to the build directory for the mechanism.
         """
         mechanism_name = os.path.basename(path_to_mod_file).replace('.mod', '')
-        parent_dir = os.path.dirname(path_to_mod_file)
+        build_hash = self._get_build_hash(path_to_mod_file)
+        return self._get_build_dir(mechanism_name, build_hash)
+
+    def _get_library_dir(self, paths_to_mod_files) -> str:
+        """
+        Get the build directory for a library of several mod files in the cache.
+
+        Parameters
+        ----------
+        paths_to_mod_files : list[str]
+            Paths to the .mod files.
+
+        Returns
+        -------
+        str
+            Path to the build directory for the library.
+        """
+        sha = hashlib.sha256()
+        for path_to_mod_file in sorted(paths_to_mod_files, key=os.path.basename):
+            sha.update(os.path.basename(path_to_mod_file).encode())
+            sha.update(self._get_build_hash(path_to_mod_file).encode())
+        return self._get_build_dir('nrnmech', sha.hexdigest()[:16])
+
+    def _get_build_dir(self, name, build_hash):
+        build_dir = os.path.join(self.cache_dir, f'{name}-{build_hash}')
         if sys.platform.startswith('win'):
-            return os.path.join(parent_dir, mechanism_name, mechanism_name)
+            return os.path.join(build_dir, name)
         else:
-            return os.path.join(parent_dir, mechanism_name)
+            return build_dir
 
     def _clean_mechanism_dir(self, mechanism_dir: str) -> None:
         
@@ -66,7 +177,8 @@ class MODFileLoader():
         path_to_mod_file : str
             Path to the .mod file.
         recompile : bool
-            Force recompilation even if already compiled.
+            Force recompilation even if a build for the current
+            content of the mod file already exists in the cache.
         """
         mechanism_name = os.path.basename(path_to_mod_file).replace('.mod', '')
         mechanism_dir = self._get_mechanism_dir(path_to_mod_file)      
@@ -81,19 +193,138 @@ class MODFileLoader():
         if recompile and os.path.exists(mechanism_dir):
             self._clean_mechanism_dir(mechanism_dir)
 
-        self._separate_and_compile(mechanism_name, mechanism_dir, path_to_mod_file)
+        result = self._separate_and_compile(mechanism_name, mechanism_dir, [path_to_mod_file])
+        self._report_compilation(mechanism_name, result)
+        if result is not None and result.returncode != 0:
+            return
 
         # Load the mechanism
         self._load_mechanism(mechanism_name, mechanism_dir)
 
 
+    def load_mechanisms(self, paths_to_mod_files, 
+                        recompile: bool = False, separate: bool = False,
+                        max_workers: int = None) -> None:
+        """
+        Load several mechanisms from the specified mod files.
+
+        By default, the mod files are compiled into a single library 
+        with one call to the compiler and the library is loaded into 
+        NEURON once. If `separate` is True, each mechanism is compiled 
+        into its own library (e.g. to swap it at runtime). The independent 
+        compilations then run concurrently and the libraries are loaded 
+        in the order of the mod files once all of them are compiled.
+
+        Mechanisms that are already loaded are skipped. Libraries are 
+        cached by the content of their mod files.
+
+        Parameters
+        ----------
+        paths_to_mod_files : list[str]
+            Paths to the .mod files.
+        recompile : bool
+            Force recompilation even if a build for the current
+            content of the mod files already exists in the cache.
+        separate : bool
+            Whether to compile each mechanism into its own library.
+        max_workers : int, optional
+            The maximum number of concurrent compilations when `separate`
+            is True. If None, the number of CPUs is used.
+        """
+        paths = {}
+        for path_to_mod_file in paths_to_mod_files:
+            mechanism_name = os.path.basename(path_to_mod_file).replace('.mod', '')
+            if mechanism_name in self._loaded_mechanisms:
+                self._log(f'Mechanism "{mechanism_name}" already loaded')
+            elif hasattr(h, mechanism_name):
+                self._log(f'Mechanism "{mechanism_name}" already exists in hoc')
+                self._loaded_mechanisms[mechanism_name] = None
+            else:
+                paths[mechanism_name] = path_to_mod_file
+        if not paths:
+            return
+
+        if self.verbose: print(f"{'=' * 60}\nLoading mechanisms {', '.join(paths)} to NEURON...")
+
+        if separate:
+            self._compile_and_load_separately(paths, recompile, max_workers)
+            return
+
+        library_dir = self._get_library_dir(paths.values())
+        if recompile and os.path.exists(library_dir):
+            self._clean_mechanism_dir(library_dir)
+
+        result = self._separate_and_compile('nrnmech', library_dir, list(paths.values()))
+        self._report_compilation(', '.join(paths), result)
+        if result is not None and result.returncode != 0:
+            return
+
+        try:
+            loaded = neuron.load_mechanisms(library_dir)
+        except Exception as e:
+            print(f"Failed to load mechanisms {', '.join(paths)}: {e}")
+            return
+        if not loaded:
+            print(f"Failed to load mechanisms {', '.join(paths)} from {library_dir}")
+            return
+        for mechanism_name in paths:
+            self._loaded_mechanisms[mechanism_name] = library_dir
+        self._log(f'Loaded mechanisms {", ".join(paths)} from {library_dir}')
+
+
     # HELPER METHODS
 
-    def _separate_and_compile(self, mechanism_name, mechanism_dir, path_to_mod_file):
+    def _compile_and_load_separately(self, paths, recompile, max_workers):
+        """
+        Compile each mechanism into its own library in a pool of threads
+        and load the libraries in order once all compilations are done.
+
+        Parameters
+        ----------
+        paths : dict[str, str]
+            The paths to the .mod files by mechanism name.
+        recompile : bool
+            Force recompilation even if a build exists in the cache.
+        max_workers : int, optional
+            The maximum number of concurrent compilations.
+        """
+        mechanism_dirs = {
+            mechanism_name: self._get_mechanism_dir(path_to_mod_file)
+            for mechanism_name, path_to_mod_file in paths.items()
+        }
+        if recompile:
+            for mechanism_dir in mechanism_dirs.values():
+                if os.path.exists(mechanism_dir):
+                    self._clean_mechanism_dir(mechanism_dir)
+
+        max_workers = max_workers or os.cpu_count() or 1
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(paths))) as executor:
+            results = list(executor.map(
+                lambda mechanism_name: self._separate_and_compile(
+                    mechanism_name, 
+                    mechanism_dirs[mechanism_name], 
+                    [paths[mechanism_name]]
+                ),
+                paths
+            ))
+
+        for mechanism_name, result in zip(paths, results):
+            self._report_compilation(mechanism_name, result)
+        for mechanism_name, result in zip(paths, results):
+            if result is not None and result.returncode != 0:
+                continue
+            self._load_mechanism(mechanism_name, mechanism_dirs[mechanism_name])
+
+
+    def _separate_and_compile(self, mechanism_name, mechanism_dir, paths_to_mod_files):
         """
         Separate the mechanism files into their own directory and compile them.
         Separation is done to enable dynamic loading of mechanisms.
         Compilation is done using the appropriate command based on the platform.
+
+        The mechanism is compiled in a temporary directory which is 
+        moved to the build directory only if the compilation succeeds, 
+        so an existing build directory always holds a complete build.
         
         Parameters
         ----------
@@ -101,24 +332,63 @@ class MODFileLoader():
             Name of the mechanism.
         mechanism_dir : str
             Directory to store the mechanism files.
-        path_to_mod_file : str
-            Path to the .mod file.
+        paths_to_mod_files : list[str]
+            Paths to the .mod files to compile together.
+
+        Returns
+        -------
+        subprocess.CompletedProcess or None
+            The result of the compilation, or None if 
+            the compiled mechanism was found in the cache.
         """
+        is_windows = sys.platform.startswith('win')
+        build_dir = os.path.dirname(mechanism_dir) if is_windows else mechanism_dir
+        if os.path.exists(build_dir):
+            return None
 
-        if sys.platform.startswith('win'):
-            dll_file = os.path.join(os.path.dirname(mechanism_dir), 'nrnmech.dll')
-            if not os.path.exists(dll_file):
-                self._log(f'Compiling mechanism "{mechanism_name}"...')
-                os.makedirs(mechanism_dir, exist_ok=True)
-                shutil.copy(path_to_mod_file, mechanism_dir)
-                self._compile_files(mechanism_dir, ["mknrndll"], shell=True)
+        tmp_build_dir = f'{build_dir}.tmp{os.getpid()}'
+        tmp_mechanism_dir = os.path.join(tmp_build_dir, mechanism_name) if is_windows else tmp_build_dir
+        os.makedirs(tmp_mechanism_dir, exist_ok=True)
+        for path_to_mod_file in paths_to_mod_files:
+            shutil.copy(path_to_mod_file, tmp_mechanism_dir)
+        try:
+            result = self._compile_files(tmp_mechanism_dir, self._compile_command, shell=is_windows)
+            if result.returncode == 0:
+                try:
+                    os.replace(tmp_build_dir, build_dir)
+                except OSError:
+                    # Another process has compiled the same mechanism meanwhile
+                    if not os.path.exists(build_dir):
+                        raise
+        finally:
+            shutil.rmtree(tmp_build_dir, ignore_errors=True)
+        return result
+
+
+    def _report_compilation(self, mechanism_name, result):
+        """
+        Report the result of the compilation of a mechanism.
+
+        Parameters
+        ----------
+        mechanism_name : str
+            Name of the mechanism.
+        result : subprocess.CompletedProcess or None
+            The result returned by `_separate_and_compile`.
+        """
+        if result is None:
+            self._log(f'Reusing compiled mechanism "{mechanism_name}"')
+        elif result.returncode == 0:
+            self._log(f'Compiled mechanism "{mechanism_name}".')
+            if self.verbose and result.stdout:
+                print(result.stdout)
         else:
-            x86_64_dir = os.path.join(mechanism_dir, 'x86_64')
-            if not os.path.exists(x86_64_dir):
-                self._log(f'Compiling mechanism "{mechanism_name}"...')
-                os.makedirs(mechanism_dir, exist_ok=True)
-                shutil.copy(path_to_mod_file, mechanism_dir)
-                self._compile_files(mechanism_dir, ["nrnivmodl"])
+            print(f'Compilation of "{mechanism_name}" failed with return code {result.returncode}')
+            if self.verbose:
+                if result.stdout:
+                    print("Compiler output:\n", result.stdout)
+                if result.stderr:
+                    print("Compiler errors:\n", result.stderr)
 
 
     def _load_mechanism(self, mechanism_name: str, mechanism_dir: str) -> None:
@@ -136,13 +406,17 @@ class MODFileLoader():
 
         if hasattr(h, mechanism_name):
             self._log(f'Mechanism "{mechanism_name}" already exists in hoc')
+            self._loaded_mechanisms[mechanism_name] = None
         else:
             try:
-                neuron.load_mechanisms(mechanism_dir)
+                loaded = neuron.load_mechanisms(mechanism_dir)
             except Exception as e:
                 print(f"Failed to load mechanism {mechanism_name}: {e}")
                 return
-        self._loaded_mechanisms.add(mechanism_name)
+            if not loaded:
+                print(f"Failed to load mechanism {mechanism_name} from {mechanism_dir}")
+                return
+            self._loaded_mechanisms[mechanism_name] = mechanism_dir
         self._log(f'Loaded mechanism "{mechanism_name}"')
         
 
@@ -163,31 +437,16 @@ class MODFileLoader():
 
         Returns
         -------
-        bool
-            True if compilation succeeded, False otherwise.
+        subprocess.CompletedProcess
+            The result of the compilation with the return code
+            and the captured output of the compiler.
         """
         path_str = str(path)
 
-        try:
-            result = subprocess.run(
-                command,
-                cwd=path_str,
-                check=True,
-                capture_output=True,
-                text=True,
-                shell=shell
-            )
-
-            self._log("Compilation successful.")
-            if self.verbose and result.stdout:
-                print(result.stdout)
-            return
-
-        except subprocess.CalledProcessError as e:
-            print(f"Compilation failed with return code {e.returncode}")
-            if self.verbose:
-                if e.stdout:
-                    print("Compiler output:\n", e.stdout)
-                if e.stderr:
-                    print("Compiler errors:\n", e.stderr)
-            return
+        return subprocess.run(
+            command,
+            cwd=path_str,
+            capture_output=True,
+            text=True,
+            shell=shell
+        )
@@ -5,35 +5,59 @@ import re
 import pprint
 from typing import List, Dict, Union, Any
 
-from dendrotweaks.biophys.io.grammar import title, comment_block
-from dendrotweaks.biophys.io.grammar import neuron_block
-from dendrotweaks.biophys.io.grammar import units_block, parameter_block, assigned_block
-from dendrotweaks.biophys.io.grammar import state_block
-from dendrotweaks.biophys.io.grammar import breakpoint_block, derivative_block, initial_block
-from dendrotweaks.biophys.io.grammar import function_block, procedure_block
-
 from dendrotweaks.biophys.io.ast import AbstracSyntaxTree
 
 
+_BLOCK_GRAMMARS = None
+
+
+def get_block_grammars() -> Dict[str, Any]:
+    """
+    Get the Pyparsing grammars of the MOD file blocks.
+
+    The grammars are built on the first call, when a MOD file
+    is parsed for the first time, and are reused afterwards.
+
+    Returns
+    -------
+    Dict[str, Any]
+        The grammars by block name.
+    """
+    global _BLOCK_GRAMMARS
+    if _BLOCK_GRAMMARS is None:
+        from dendrotweaks.biophys.io import grammar
+        block_grammars = {
+            "TITLE": grammar.title,
+            "COMMENT": grammar.comment_block,
+            "NEURON": grammar.neuron_block,
+            "UNITS": grammar.units_block,
+            "PARAMETER": grammar.parameter_block,
+            "ASSIGNED": grammar.assigned_block,
+            "STATE": grammar.state_block,
+            "BREAKPOINT": grammar.breakpoint_block,
+            "DERIVATIVE": grammar.derivative_block,
+            "INITIAL": grammar.initial_block,
+            "FUNCTION": grammar.function_block,
+            "PROCEDURE": grammar.procedure_block,
+        }
+        for block_grammar in block_grammars.values():
+            block_grammar.streamline()
+        _BLOCK_GRAMMARS = block_grammars
+    return _BLOCK_GRAMMARS
+
+
 class MODFileParser():
     """
     A parser for MOD files that uses a Pyparsing grammar 
     to parse the content of the file.
     """
 
-    BLOCKS = {"TITLE": title,
-              "COMMENT": comment_block,
-              "NEURON": neuron_block,
-              "UNITS": units_block,
-              "PARAMETER": parameter_block,
-              "ASSIGNED": assigned_block,
-              "STATE": state_block,
-              "BREAKPOINT": breakpoint_block,
-              "DERIVATIVE": derivative_block,
-              "INITIAL": initial_block,
-              "FUNCTION": function_block,
-              "PROCEDURE": procedure_block,
-              }
+    @property
+    def BLOCKS(self):
+        """
+        The grammars of the MOD file blocks.
+        """
+        return get_block_grammars()
 
     def __init__(self):
         self._result = {}
@@ -122,6 +122,8 @@ class Model(IOMixin, SimulationMixin):
 
         # Groups
         self._groups = []
+        self._group_index = {}
+        self._group_index_key = None
 
         # Distributions
         # self.distributed_params = {}
@@ -375,6 +377,7 @@ class Model(IOMixin, SimulationMixin):
         self._remove_domain_groups(old_name)
         # Update domains_to_mechs
         self.domains_to_mechs[domain.name] = self.domains_to_mechs.pop(old_name)
+        self._invalidate_group_index()
         self._remove_empty()
 
 
@@ -490,6 +493,7 @@ class Model(IOMixin, SimulationMixin):
                 mech = self.mechanisms[mech_name]
                 sec.insert_mechanism(mech)
 
+        self._invalidate_group_index()
         self._remove_empty()
         self.sec_tree.sort(sort_children=True, force=True)
 
@@ -549,8 +553,7 @@ class Model(IOMixin, SimulationMixin):
 
     def _remove_empty_groups(self):
         empty_groups = [group for group in self._groups 
-                        if not any(seg in group 
-                        for seg in self.seg_tree)]
+                        if not len(self._get_group_index(group))]
         for group in empty_groups:
             warnings.warn(f'Group {group.name} is empty and will be removed.')
             self.remove_group(group.name)
@@ -582,6 +585,7 @@ class Model(IOMixin, SimulationMixin):
         for sec in domain.sections:
             sec.insert_mechanism(mech)
         self._add_mechanism_params(mech)
+        self.simulator.clear_checkpoint()
 
         # TODO: Redistribute parameters if any group contains this domain
         if distribute:
@@ -632,6 +636,7 @@ class Model(IOMixin, SimulationMixin):
         for sec in domain.sections:
             sec.uninsert_mechanism(mech)
         self.domains_to_mechs[domain_name].remove(mech.name)
+        self.simulator.clear_checkpoint()
 
         if not self.mechs_to_domains.get(mech.name):
             warnings.warn(f'Mechanism {mech.name} is not inserted in any domain and will be removed.')
@@ -708,6 +713,56 @@ class Model(IOMixin, SimulationMixin):
             groups_to_distrs.pop(group_name, None)
 
 
+    def _invalidate_group_index(self):
+        """
+        Clear the cached group membership index. Call after modifying 
+        the domains, the morphology or the segmentation of the model.
+        """
+        self._group_index = {}
+        self._group_index_key = None
+
+
+    def _get_group_index(self, group):
+        """
+        Get the indices of the segments (in the segment tree) that belong 
+        to a group. The indices are computed once per group definition 
+        and cached until the index is invalidated.
+
+        Parameters
+        ----------
+        group : SegmentGroup
+            The group to get the segment indices for.
+
+        Returns
+        -------
+        numpy.ndarray
+            The indices of the segments in the group.
+        """
+        # Rebuild the index if the segment tree was replaced or resized
+        key = (id(self.seg_tree), len(self.seg_tree))
+        if key != self._group_index_key:
+            self._group_index = {}
+            self._group_index_key = key
+
+        signature = (tuple(group.domains), group.select_by, 
+                     group.min_value, group.max_value)
+        index = self._group_index.get(signature)
+        if index is None:
+            index = group.get_indices(self.seg_tree)
+            self._group_index[signature] = index
+        return index
+
+
+    @property
+    def groups_to_segments(self):
+        """
+        The dictionary mapping segment groups to the segments they contain.
+        """
+        segments = self.seg_tree.segments
+        return {group.name: [segments[i] for i in self._get_group_index(group)]
+                for group in self._groups}
+
+
     def move_group_down(self, name):
         """
         Move a group down in the list of groups.
@@ -808,10 +863,8 @@ class Model(IOMixin, SimulationMixin):
         """
         Distribute all parameters to the segments.
         """
-        groups_to_segments = {group.name: [seg for seg in self.seg_tree if seg in group] 
-                         for group in self._groups}
         for param_name in self.params:
-            self.distribute(param_name, groups_to_segments)
+            self.distribute(param_name)
 
     
     def distribute(self, param_name: str, precomputed_groups=None):
@@ -823,33 +876,65 @@ class Model(IOMixin, SimulationMixin):
         param_name : str
             The name of the parameter to distribute.
         precomputed_groups : dict, optional
-            A dictionary mapping group names to segments. Default is None.
+            A dictionary mapping group names to segments of the segment tree,
+            e.g. to distribute the parameter to a subset of the segments. 
+            Default is None (use the cached group membership index).
         """
+        # The saved prerun state is no longer valid
+        self.simulator.clear_checkpoint()
+
         if param_name == 'Ra':
             self._distribute_Ra(precomputed_groups)
             return
 
-        groups_to_segments = precomputed_groups
-        if groups_to_segments is None:
-            groups_to_segments = {group.name: [seg for seg in self.seg_tree if seg in group] 
-                                for group in self._groups}
-
         param_distributions = self.params[param_name]
+        groups = self.groups
 
         for group_name, distribution in param_distributions.items():
             
-            filtered_segments = groups_to_segments[group_name]
+            if precomputed_groups is None:
+                index = self._get_group_index(groups[group_name])
+                segments = self.seg_tree.segments
+                filtered_segments = [segments[i] for i in index]
+            else:
+                filtered_segments = precomputed_groups[group_name]
 
             if distribution == 'inherit':
                 for seg in filtered_segments:
                     value = seg.parent.get_param_value(param_name)
                     seg.set_param_value(param_name, value)
             else:
-                for seg in filtered_segments:
-                    value = distribution(seg.path_distance())
+                if precomputed_groups is None:
+                    distances = self.seg_tree.path_distances()[index]
+                else:
+                    seg_idxs = np.array([seg.idx for seg in filtered_segments], dtype=int)
+                    distances = self.seg_tree.path_distances()[seg_idxs]
+                values = self._evaluate_distribution(distribution, distances)
+                for seg, value in zip(filtered_segments, values):
                     seg.set_param_value(param_name, value)
 
 
+    @staticmethod
+    def _evaluate_distribution(distribution, distances):
+        """
+        Evaluate a distribution on an array of distances in a single call.
+
+        Parameters
+        ----------
+        distribution : Distribution
+            The distribution to evaluate.
+        distances : numpy.ndarray
+            The path distances of the segments.
+
+        Returns
+        -------
+        list[float]
+            The values of the distribution, one per distance.
+        """
+        values = np.broadcast_to(distribution(distances), distances.shape)
+        return values.astype(float).tolist()
+
+
     def _distribute_Ra(self, precomputed_groups=None):
         """
         Distribute the axial resistance to the segments.
@@ -857,8 +942,7 @@ class Model(IOMixin, SimulationMixin):
 
         groups_to_segments = precomputed_groups
         if groups_to_segments is None:
-            groups_to_segments = {group.name: [seg for seg in self.seg_tree if seg in group] 
-                                for group in self._groups}
+            groups_to_segments = self.groups_to_segments
 
         param_distributions = self.params['Ra']
 
@@ -868,9 +952,13 @@ class Model(IOMixin, SimulationMixin):
             if distribution == 'inherit':
                 raise NotImplementedError("Inheritance of Ra is not implemented.")
             else:
-                for seg in filtered_segments:
-                    value = distribution(seg._section.path_distance(relative_position=0.5))
-                    seg._section._ref.Ra = value
+                # Ra is a section-level parameter
+                sections = list(dict.fromkeys(seg._section for seg in filtered_segments))
+                distances = np.array([sec.path_distance(relative_position=0.5) 
+                                      for sec in sections], dtype=float)
+                values = self._evaluate_distribution(distribution, distances)
+                for sec, value in zip(sections, values):
+                    sec._ref.Ra = value
 
 
     def remove_distribution(self, param_name, group_name):
@@ -981,7 +1069,9 @@ class Model(IOMixin, SimulationMixin):
         if param_name not in self.params:
             warnings.warn(f'Parameter {param_name} not found.')
 
-        values = [(seg.path_distance(), seg.get_param_value(param_name)) for seg in self.seg_tree]
+        distances = self.seg_tree.path_distances().tolist()
+        values = [(distance, seg.get_param_value(param_name)) 
+                  for distance, seg in zip(distances, self.seg_tree)]
         colors = [seg.domain_color for seg in self.seg_tree]
 
         valid_values = [(x, y) for (x, y), color in zip(values, colors) if not pd.isna(y) and y != 0]
@@ -1030,7 +1120,9 @@ class Model(IOMixin, SimulationMixin):
         """
         if not isinstance(group_names, list):
             raise ValueError('Group names must be a list.')
-        return [seg for group_name in group_names for seg in self.seg_tree.segments if seg in self.groups[group_name]]
+        segments = self.seg_tree.segments
+        return [segments[i] for group_name in group_names 
+                for i in self._get_group_index(self.groups[group_name])]
 
 
     def remove_subtree(self, section):
@@ -1047,6 +1139,7 @@ class Model(IOMixin, SimulationMixin):
                 if sec in domain.sections:
                     domain.remove_section(sec)
         self.sec_tree.remove_subtree(section)
+        self._invalidate_group_index()
         self._remove_empty()
 
 
@@ -1057,6 +1150,7 @@ class Model(IOMixin, SimulationMixin):
         domains = [self.domains[domain_name] for domain_name in domain_names]
         for domain in domains[1:]:
             domains[0].merge(domain)
+        self._invalidate_group_index()
         self.remove_empty()
 
 
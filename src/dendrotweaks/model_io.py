@@ -13,6 +13,8 @@ import pandas as pd
 from dendrotweaks import __version__
 from dendrotweaks.morphology.io import create_point_tree, create_section_tree, create_segment_tree
 from dendrotweaks.morphology.io import create_domains
+from dendrotweaks.morphology.io import get_morphology_cache_key
+from dendrotweaks.morphology.io import save_morphology_cache, load_morphology_cache
 from dendrotweaks.biophys.io import create_channel, standardize_channel
 from dendrotweaks.biophys.groups import SegmentGroup
 from dendrotweaks.biophys.distributions import Distribution
@@ -78,7 +80,7 @@ class IOMixin():
     # -----------------------------------------------------------------------
 
     def load_morphology(self, file_name, soma_notation='3PS', 
-        align=True, sort_children=True, force=False) -> None:
+        align=True, sort_children=True, force=False, use_cache=True) -> None:
         """
         Read an SWC file and build the SWC and section trees.
 
@@ -95,10 +97,28 @@ class IOMixin():
             in the tree sorting algorithms. If True, the traversal visits 
             children with shorter subtrees first and assigns them lower indices. If False, children
             are visited in their original SWC file order (matching NEURON's behavior).
+        use_cache : bool, optional
+            Whether to reuse the processed morphology cached in the
+            `morphology/.cache` folder of the model. The cache is keyed by 
+            the content of the SWC file and the options above, and is 
+            (re)written whenever it is missing or outdated. Default is True.
         """
         # self.name = file_name.split('.')[0]
         self.morphology_name = file_name.replace('.swc', '')
         path_to_swc_file = self.path_manager.get_abs_path(f'morphology/{file_name}.swc')
+
+        if use_cache:
+            path_to_cache = self.path_manager.get_abs_path(
+                f'morphology/.cache/{self.morphology_name}.npz')
+            cache_key = get_morphology_cache_key(
+                path_to_swc_file, soma_notation=soma_notation, align=align,
+                sort_children=sort_children, force=force)
+            sec_tree = load_morphology_cache(path_to_cache, cache_key)
+            if sec_tree is not None:
+                if self.verbose: print(f'Loaded cached morphology {self.morphology_name}.')
+                self._set_section_tree(sec_tree)
+                return
+
         point_tree = create_point_tree(path_to_swc_file)
         # point_tree.remove_overlaps()
         point_tree.change_soma_notation(soma_notation)
@@ -107,10 +127,46 @@ class IOMixin():
             point_tree.shift_coordinates_to_soma_center()
             point_tree.align_apical_dendrite()
             point_tree.round_coordinates(8)
-        self.point_tree = point_tree
 
+        self._build_morphology(point_tree, sort_children=sort_children, force=force)
+
+        if use_cache:
+            try:
+                save_morphology_cache(path_to_cache, self.sec_tree, cache_key)
+            except OSError as e:
+                warnings.warn(f'Could not cache the morphology {self.morphology_name}: {e}')
+
+
+    def _build_morphology(self, point_tree, sort_children=True, force=False):
+        """
+        Build the section and segment trees from a point tree
+        and create the sections in the simulator.
+
+        Parameters
+        ----------
+        point_tree : PointTree
+            The (standardized) point tree of the morphology.
+        sort_children : bool, optional
+            Whether to sort the children of each node by increasing subtree size.
+        force : bool, optional
+            Whether to force the sorting of the trees even if they are already sorted.
+        """
         sec_tree = create_section_tree(point_tree)
         sec_tree.sort(sort_children=sort_children, force=force)
+        self._set_section_tree(sec_tree)
+
+
+    def _set_section_tree(self, sec_tree):
+        """
+        Set up the model for a sorted section tree: create the domains, 
+        the sections in the simulator and the segment tree.
+
+        Parameters
+        ----------
+        sec_tree : SectionTree
+            The sorted section tree with a reference to its point tree.
+        """
+        self.point_tree = sec_tree._point_tree
         self.sec_tree = sec_tree
 
         self.domains = create_domains(sec_tree)
@@ -118,6 +174,7 @@ class IOMixin():
         self.create_and_reference_sections_in_simulator()
         seg_tree = create_segment_tree(sec_tree)
         self.seg_tree = seg_tree
+        self._invalidate_group_index()
 
         self._add_default_segment_groups()
         self._initialize_domains_to_mechs()
@@ -187,7 +244,8 @@ class IOMixin():
         Parameters
         ----------
         recompile : bool, optional
-            Whether to recompile the mechanisms.
+            Whether to recompile the mechanisms even if compiled versions 
+            of the same MOD files are cached.
         """
         leak = LeakChannel()
         self.mechanisms[leak.name] = leak
@@ -198,7 +256,7 @@ class IOMixin():
         self.load_mechanisms('default_mod', recompile=recompile)
 
 
-    def add_mechanisms(self, dir_name:str = 'mod', recompile=True) -> None:
+    def add_mechanisms(self, dir_name:str = 'mod', recompile=False, batch=False) -> None:
         """
         Add a set of mechanisms from an archive to the model.
 
@@ -207,20 +265,27 @@ class IOMixin():
         dir_name : str, optional
             The name of the archive to load mechanisms from. Default is 'mod'.
         recompile : bool, optional
-            Whether to recompile the mechanisms.
+            Whether to recompile the mechanisms even if compiled versions 
+            of the same MOD files are cached.
+        batch : bool, optional
+            Whether to compile all the mechanisms into a single library
+            and load it at once instead of one library per mechanism.
+            Default is False.
         """
+        mechanism_names = self.path_manager.list_files(dir_name, extension='mod')
         # Create Mechanism objects and add them to the model
-        for mechanism_name in self.path_manager.list_files(dir_name, extension='mod'):
+        for mechanism_name in mechanism_names:
             self.add_mechanism(mechanism_name, 
-                               load=True, 
+                               load=False, 
                                dir_name=dir_name, 
                                recompile=recompile)            
+        self._load_mechanism_files(mechanism_names, dir_name, recompile, batch)
 
 
     def add_mechanism(self, mechanism_name: str, 
                       python_template_name: str = 'default',
-                      load=True, dir_name: str = 'mod', recompile=True
-                      ) -> None:
+                      load=True, dir_name: str = 'mod', recompile=False,
+                      use_cache=True) -> None:
         """
         Create a Mechanism object from the MOD file (or LeakChannel).
 
@@ -232,11 +297,24 @@ class IOMixin():
             The name of the Python template to use. Default is 'default'.
         load : bool, optional
             Whether to load the mechanism using neuron.load_mechanisms.
+        dir_name : str, optional
+            The name of the directory with the MOD file. Default is 'mod'.
+        recompile : bool, optional
+            Whether to recompile the mechanism even if a compiled 
+            version of the same MOD file is cached. Default is False.
+        use_cache : bool, optional
+            Whether to reuse the conversion of the MOD file to Python
+            cached in the `python/.cache` folder of the model. The cache 
+            is keyed by the content of the MOD file and the template. 
+            Default is True.
         """
         paths = self.path_manager.get_channel_paths(
             mechanism_name, 
             python_template_name=python_template_name
         )
+        if use_cache:
+            paths['path_to_cache'] = self.path_manager.get_abs_path(
+                f'python/.cache/{mechanism_name}.json')
         try:
             mech = create_channel(**paths)
         except NotImplementedError as e:
@@ -256,7 +334,7 @@ class IOMixin():
             self.load_mechanism(mechanism_name, dir_name, recompile)        
 
 
-    def load_mechanisms(self, dir_name: str = 'mod', recompile=True) -> None:
+    def load_mechanisms(self, dir_name: str = 'mod', recompile=False, batch=False) -> None:
         """
         Load mechanisms from an archive.
 
@@ -265,11 +343,45 @@ class IOMixin():
         dir_name : str, optional
             The name of the archive to load mechanisms from.
         recompile : bool, optional
-            Whether to recompile the mechanisms.
+            Whether to recompile the mechanisms even if compiled versions 
+            of the same MOD files are cached.
+        batch : bool, optional
+            Whether to compile all the mechanisms into a single library
+            and load it at once instead of one library per mechanism.
+            Default is False.
         """
         mod_files = self.path_manager.list_files(dir_name, extension='mod')
-        for mechanism_name in mod_files:
-            self.load_mechanism(mechanism_name, dir_name, recompile)
+        self._load_mechanism_files(mod_files, dir_name, recompile, batch)
+
+
+    def _load_mechanism_files(self, mechanism_names, dir_name='mod', 
+                              recompile=False, batch=False) -> None:
+        """
+        Compile several mechanisms and load them.
+
+        Parameters
+        ----------
+        mechanism_names : list[str]
+            The names of the mechanisms to load.
+        dir_name : str, optional
+            The name of the directory to load the mechanisms from. Default is 'mod'.
+        recompile : bool, optional
+            Whether to recompile the mechanisms even if compiled 
+            versions of the same MOD files are cached.
+        batch : bool, optional
+            Whether to compile the mechanisms into a single library.
+            Otherwise, each mechanism is compiled into its own library
+            and the compilations run concurrently. Default is False.
+        """
+        paths_to_mod_files = [
+            self.path_manager.get_abs_path(f"{dir_name}/{mechanism_name}.mod")
+            for mechanism_name in mechanism_names
+        ]
+        self.mod_loader.load_mechanisms(
+            paths_to_mod_files=paths_to_mod_files, 
+            recompile=recompile,
+            separate=not batch
+        )
 
 
     def load_mechanism(self, mechanism_name, dir_name='mod', recompile=False) -> None:
@@ -283,7 +395,8 @@ class IOMixin():
         dir_name : str, optional
             The name of the directory to load the mechanism from. Default is 'mod'.
         recompile : bool, optional
-            Whether to recompile the mechanism.
+            Whether to recompile the mechanism even if a compiled 
+            version of the same MOD file is cached.
         """
         path_to_mod_file = self.path_manager.get_abs_path(
             f"{dir_name}/{mechanism_name}.mod"
@@ -336,7 +449,7 @@ class IOMixin():
         standard_channel = standardize_channel(channel, **paths)
         
         self.mechanisms[standard_channel.name] = standard_channel
-        self.load_mechanism(standard_channel.name, recompile=True)
+        self.load_mechanism(standard_channel.name)
 
         # Insert the new channel
         for domain_name in channel_domain_names:
@@ -449,7 +562,7 @@ class IOMixin():
             json.dump(data, f, **kwargs)
 
 
-    def load_biophys(self, file_name, recompile=True):
+    def load_biophys(self, file_name, recompile=False, batch=False):
         """
         Load the biophysical properties of the model from a JSON file.
 
@@ -458,7 +571,12 @@ class IOMixin():
         file_name : str
             The name of the file to read from.
         recompile : bool, optional
-            Whether to recompile the mechanisms after loading. Default is True.
+            Whether to recompile the mechanisms even if compiled versions 
+            of the same MOD files are cached. Default is False.
+        batch : bool, optional
+            Whether to compile the mechanisms of the model into a single 
+            library and load it at once instead of one library per mechanism.
+            Default is False.
         """
         self.add_default_mechanisms()
         
@@ -468,10 +586,13 @@ class IOMixin():
         with open(path_to_json, 'r') as f:
             data = json.load(f)
 
-        for mech_name in {mech for mechs in data['domains'].values() for mech in mechs}:
-            if mech_name in ['Leak', 'CaDyn', 'Independent']:
-                continue
-            self.add_mechanism(mech_name, dir_name='mod', recompile=recompile)            
+        mech_names = sorted(
+            {mech for mechs in data['domains'].values() for mech in mechs}
+            - {'Leak', 'CaDyn', 'Independent'}
+        )
+        for mech_name in mech_names:
+            self.add_mechanism(mech_name, load=False, dir_name='mod', recompile=recompile)            
+        self._load_mechanism_files(mech_names, 'mod', recompile, batch)
 
         self.from_dict(data)
 
@@ -531,12 +652,21 @@ class IOMixin():
             'sec_idx': [],
             'loc': [],
             'var': [],
+            'dt': [],
+            'start': [],
+            'stop': [],
         }
 
-        for var, recs in self.simulator.recordings.items():
+        for var, recs in self.simulator._recordings.items():
+            windows = self.simulator._recording_windows.get(var, {})
             rec_data['var'].extend([var] * len(recs))
             rec_data['sec_idx'].extend([seg._section.idx for seg in recs])
             rec_data['loc'].extend([seg.x for seg in recs])
+            for seg in recs:
+                dt, start, stop = windows.get(seg, (None, None, None))
+                rec_data['dt'].append(dt)
+                rec_data['start'].append(start)
+                rec_data['stop'].append(stop)
 
         df = pd.DataFrame(rec_data)
         if df.empty: return
@@ -619,26 +749,27 @@ class IOMixin():
     # IMPORT
     # -----------------------------------------------------------------------
 
-    def _load_recordings(self, path_to_recordings_csv):
+    def _load_recordings(self, df_recs):
         """
-        Load recordings from a CSV file.
+        Load recordings from a DataFrame (see `_recordings_to_csv`).
         """
-        df_recs = pd.read_csv(path_to_recordings_csv)
-
         for row in df_recs.itertuples(index=False):
+            window = {
+                key: getattr(row, key) for key in ('dt', 'start', 'stop')
+                if not pd.isna(getattr(row, key, None))
+            }
             self.add_recording(
                 self.sec_tree.sections[row.sec_idx], 
                 row.loc, 
-                var=row.var
+                var=row.var,
+                **window
             )
 
 
-    def _load_iclamps(self, path_to_csv):
+    def _load_iclamps(self, df_iclamps):
         """
-        Load IClamps from a CSV file.
+        Load IClamps from a DataFrame (see `_iclamps_to_csv`).
         """
-        df_iclamps = pd.read_csv(path_to_csv)
-
         for row in df_iclamps.itertuples(index=False):
             self.add_iclamp(
                 self.sec_tree.sections[row.sec_idx], 
@@ -649,24 +780,15 @@ class IOMixin():
             )
     
 
-    def _load_populations(self, path_to_csv, data):
+    def _load_populations(self, df_all_syn, data):
         """
-        Load populations from a CSV and JSON file.
+        Load populations from a DataFrame (see `_synapses_to_csv`)
+        and the dictionary representation of the stimuli.
         """
-        df_all_syn = pd.read_csv(path_to_csv)
-
         for pop_name, pop_data in data['stimuli']['populations'].items():
 
             df_pop = df_all_syn[df_all_syn['pop_idx'] == pop_data['idx']]
 
-            segments = [self.sec_tree.sections[sec_idx](loc) 
-                        for sec_idx, loc in zip(df_pop['sec_idx'], df_pop['loc'])]
-            
-            pop = Population(name=pop_name, 
-                            segments=segments, 
-                            N=pop_data['N'], 
-                            syn_type=pop_data['syn_type'])
-            
             syn_locs = [
                 (
                     self.sec_tree.sections[sec_idx], 
@@ -677,10 +799,19 @@ class IOMixin():
                     df_pop['loc'].tolist()
                 )
             ]
+            segments = list(dict.fromkeys(sec(loc) for sec, loc in syn_locs))
             
+            pop = Population(name=pop_name, 
+                            segments=segments, 
+                            N=pop_data['N'], 
+                            syn_type=pop_data['syn_type'])
+
+            # Set the parameters before creating the synapses
+            # so that they are applied only once
+            pop.kinetic_params.update(pop_data['kinetic_params'])
+            pop.input_params.update(pop_data['input_params'])
             pop.allocate_synapses(syn_locs=syn_locs)
-            pop.update_kinetic_params(**pop_data['kinetic_params'])
-            pop.update_input_params(**pop_data['input_params'])
+            pop.create_inputs()
             self._add_population(pop)
 
 
@@ -751,16 +882,43 @@ class IOMixin():
         with open(path_to_json, 'r') as f:
             data = json.load(f)
 
+        def read_csv(path_to_csv):
+            return pd.read_csv(path_to_csv) if os.path.exists(path_to_csv) else None
+
+        self.stimuli_from_dict(
+            data,
+            df_recordings=read_csv(path_to_recordings_csv),
+            df_iclamps=read_csv(path_to_iclamps_csv),
+            df_synapses=read_csv(path_to_synapses_csv),
+        )
+
+
+    def stimuli_from_dict(self, data, df_recordings=None, df_iclamps=None, df_synapses=None):
+        """
+        Load the stimuli from a dictionary representation 
+        and the tables of recording, IClamp and synapse locations.
+
+        Parameters
+        ----------
+        data : dict
+            The dictionary representation of the stimuli (see `stimuli_to_dict`).
+        df_recordings : pd.DataFrame, optional
+            The recording locations (see `_recordings_to_csv`).
+        df_iclamps : pd.DataFrame, optional
+            The IClamp locations and parameters (see `_iclamps_to_csv`).
+        df_synapses : pd.DataFrame, optional
+            The synapse locations (see `_synapses_to_csv`).
+        """
         self._clear_and_setup_simulation(data)
 
-        if os.path.exists(path_to_iclamps_csv):
-            self._load_iclamps(path_to_iclamps_csv)
+        if df_iclamps is not None:
+            self._load_iclamps(df_iclamps)
       
-        if os.path.exists(path_to_synapses_csv):
-            self._load_populations(path_to_synapses_csv, data)
+        if df_synapses is not None:
+            self._load_populations(df_synapses, data)
 
-        if os.path.exists(path_to_recordings_csv):
-            self._load_recordings(path_to_recordings_csv)
+        if df_recordings is not None:
+            self._load_recordings(df_recordings)
 
 
     # ========================================================================
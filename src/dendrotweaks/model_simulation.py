@@ -3,13 +3,20 @@
 
 # Imports
 import os
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 
 # DendroTweaks imports
 from dendrotweaks.stimuli.populations import Population
 from dendrotweaks.stimuli.iclamps import IClamp
 from dendrotweaks.morphology.io import create_segment_tree
+from dendrotweaks.morphology.point_trees import get_coordinates
 from dendrotweaks.prerun import prerun
-from dendrotweaks.utils import calculate_lambda_f
+from dendrotweaks.sweep import get_model_state, validate_condition
+from dendrotweaks.sweep import init_worker, run_condition
+from dendrotweaks.utils import calculate_lambda_f_sections
 
 # Warnings configuration
 import warnings
@@ -46,20 +53,52 @@ class SimulationMixin:
         """
         Temporarily save and clear stimuli.
         """
-        self.export_stimuli(file_name='_temp_stimuli')
+        self._temp_stimuli = {
+            'data': self.stimuli_to_dict(),
+            'df_recordings': self._recordings_to_csv(),
+            'df_iclamps': self._iclamps_to_csv(),
+            'df_synapses': self._synapses_to_csv(),
+        }
         self.remove_all_stimuli()
         self.remove_all_recordings()
 
 
     def _temp_reload_stimuli(self):
         """
-        Load stimuli from a temporary file and clean up.
+        Reload the temporarily saved stimuli.
         """
-        self.load_stimuli(file_name='_temp_stimuli')
-        self.path_manager.remove_folder('stimuli/_temp_stimuli')
+        temp_stimuli = self._temp_stimuli
+        del self._temp_stimuli
+        self.stimuli_from_dict(**temp_stimuli)
 
 
-    def set_segmentation(self, d_lambda=0.1, f=100):
+    def _calculate_nseg(self, d_lambda, f):
+        """
+        Calculate the number of segments in each section 
+        based on the frequency-dependent length constant.
+
+        Returns
+        -------
+        list[int]
+            The number of segments, one per section in the section tree.
+        """
+        sections = self.sec_tree.sections
+        points = [pt for sec in sections for pt in sec.points]
+        point_coords = get_coordinates(points)
+        coords = point_coords[:, :3]
+        diameters = 2 * point_coords[:, 3]
+        offsets = np.cumsum([0] + [len(sec.points) for sec in sections])
+
+        L = np.array([sec.L for sec in sections])
+        Ra = np.array([sec.Ra for sec in sections])
+        cm = np.array([sec.cm for sec in sections])
+
+        lambda_f = calculate_lambda_f_sections(coords, diameters, offsets, Ra, cm, f)
+        nsegs = np.maximum(1, ((L / (d_lambda * lambda_f) + 0.9) / 2).astype(int) * 2 + 1)
+        return nsegs.tolist()
+
+
+    def set_segmentation(self, d_lambda=0.1, f=100, incremental=False):
         """
         Set the number of segments in each section based on the geometry.
 
@@ -69,9 +108,19 @@ class SimulationMixin:
             The lambda value to use.
         f : float
             The frequency value to use.
+        incremental : bool, optional
+            Whether to update only the sections whose number of segments
+            changes: only their segments are recreated, their parameters 
+            redistributed and their stimuli and recordings moved to the 
+            new segments. Otherwise, the whole segment tree is rebuilt 
+            and the stimuli are reloaded. Default is False.
         """
         self.d_lambda = d_lambda
 
+        if incremental:
+            self._update_segmentation(d_lambda, f)
+            return
+
         # Temporarily save and clear stimuli
         self._temp_clear_stimuli()
 
@@ -80,19 +129,87 @@ class SimulationMixin:
             self.distribute(param_name)
 
         # Calculate lambda_f and set nseg for each section
-        for sec in self.sec_tree.sections:
-            lambda_f = calculate_lambda_f(sec.distances, sec.diameters, sec.Ra, sec.cm, f)
-            nseg = max(1, int((sec.L / (d_lambda * lambda_f) + 0.9) / 2) * 2 + 1)
+        for sec, nseg in zip(self.sec_tree.sections, self._calculate_nseg(d_lambda, f)):
             sec._nseg = sec._ref.nseg = nseg
 
         # Rebuild the segment tree and redistribute parameters
         self.seg_tree = create_segment_tree(self.sec_tree)
+        self._invalidate_group_index()
         self.distribute_all()
 
-        # Reload stimuli and clean up temporary files
+        # Reload stimuli
         self._temp_reload_stimuli()
 
 
+    def _update_segmentation(self, d_lambda, f):
+        """
+        Update the number of segments only in the sections where it changes.
+        See `set_segmentation`.
+        """
+        sections = self.sec_tree.sections
+        nsegs = self._calculate_nseg(d_lambda, f)
+        changed_nsegs = {sec: nseg for sec, nseg in zip(sections, nsegs) if nseg != sec._nseg}
+        if not changed_nsegs:
+            return
+
+        old_segments = {sec: sec.segments for sec in changed_nsegs}
+        for sec, nseg in changed_nsegs.items():
+            sec._nseg = sec._ref.nseg = nseg
+
+        # Rebuild the segment tree reusing the segments of unchanged sections
+        keep_sections = {sec for sec in sections if sec not in changed_nsegs}
+        self.seg_tree = create_segment_tree(self.sec_tree, keep_sections=keep_sections)
+        self._invalidate_group_index()
+
+        # Redistribute parameters to the new segments only
+        is_new = np.array([seg._section in changed_nsegs for seg in self.seg_tree])
+        segments = self.seg_tree.segments
+        new_groups_to_segments = {
+            group.name: [segments[i] for i in self._get_group_index(group) if is_new[i]]
+            for group in self._groups
+        }
+        for param_name in self.params:
+            self.distribute(param_name, precomputed_groups=new_groups_to_segments)
+
+        self._remap_stimuli(old_segments)
+
+
+    def _remap_stimuli(self, old_segments):
+        """
+        Move the stimuli and recordings placed on resegmented 
+        sections to the new segments of these sections.
+
+        IClamps and recordings are moved to the new segment containing 
+        the center of their old segment. Synapses keep their locations.
+
+        Parameters
+        ----------
+        old_segments : dict
+            A dictionary mapping each resegmented section to
+            its list of segments before the change.
+        """
+        old_locs = {
+            seg: (i + 0.5) / len(segs)
+            for segs in old_segments.values() for i, seg in enumerate(segs)
+        }
+        seg_map = {seg: seg._section(loc) for seg, loc in old_locs.items()}
+
+        iclamps = {}
+        for seg, iclamp in self.iclamps.items():
+            if seg in seg_map:
+                sec, loc = seg._section, old_locs[seg]
+                iclamp = IClamp(sec, loc, iclamp.amp, iclamp.delay, iclamp.dur)
+                seg = seg_map[seg]
+            iclamps[seg] = iclamp
+        self.iclamps = iclamps
+
+        for population in self.populations.values():
+            population._update_segmentation(old_segments)
+
+        self.simulator._remap_recordings(seg_map)
+        self.simulator.clear_checkpoint()
+
+
     # -----------------------------------------------------------------------
     # ICLAMPS
     # -----------------------------------------------------------------------
@@ -117,6 +234,7 @@ class SimulationMixin:
         seg = sec(loc)
         if self.iclamps.get(seg):
             self.remove_iclamp(sec, loc)
+        self.simulator.clear_checkpoint()
         iclamp = IClamp(sec, loc, amp, delay, dur)
         if self.verbose: print(f'IClamp added to sec {sec} at loc {loc}.')
         self.iclamps[seg] = iclamp
@@ -136,6 +254,7 @@ class SimulationMixin:
         seg = sec(loc)
         if self.iclamps.get(seg):
             self.iclamps.pop(seg)
+            self.simulator.clear_checkpoint()
 
 
     def remove_all_iclamps(self):
@@ -156,13 +275,17 @@ class SimulationMixin:
     # -----------------------------------------------------------------------
 
     def _add_population(self, population):
+        self.simulator.clear_checkpoint()
         self.populations[population.name] = population
 
 
-    def add_population(self, name, segments, N, syn_type):
+    def add_population(self, name, segments, N, syn_type, seed=None):
         """
         Add a population of synapses to the model.
 
+        The synapses are placed randomly on the segments
+        in proportion to the segment length.
+
         Parameters
         ----------
         name : str
@@ -173,9 +296,12 @@ class SimulationMixin:
             The number of synapses to add.
         syn_type : str
             The type of synapse to add.
+        seed : int or np.random.Generator, optional
+            The seed or the random number generator used to place
+            the synapses. Default is None (unseeded).
         """
         population = Population(name, segments, N, syn_type)
-        population.allocate_synapses()
+        population.allocate_synapses(seed=seed)
         population.create_inputs()
         self._add_population(population)
 
@@ -223,6 +349,7 @@ class SimulationMixin:
         """
         population = self.populations.pop(name)
         population.clean()
+        self.simulator.clear_checkpoint()
         
 
     def remove_all_populations(self):
@@ -248,7 +375,7 @@ class SimulationMixin:
     # SIMULATION
     # ========================================================================
 
-    def add_recording(self, sec, loc, var='v'):
+    def add_recording(self, sec, loc, var='v', dt=None, start=None, stop=None):
         """
         Add a recording to the model.
 
@@ -260,8 +387,14 @@ class SimulationMixin:
             The location along the normalized section length to record from.
         var : str, optional
             The variable to record. Default is 'v'.
-        """
-        self.simulator.add_recording(sec, loc, var)
+        dt : float, optional
+            The sampling interval of the recording in ms. Default is None (every time step).
+        start : float, optional
+            The time to start recording in ms. Default is None (from the beginning).
+        stop : float, optional
+            The time to stop recording in ms. Default is None (until the end).
+        """
+        self.simulator.add_recording(sec, loc, var, dt=dt, start=start, stop=stop)
         if self.verbose: print(f'Recording added to sec {sec} at loc {loc}.')
 
 
@@ -286,7 +419,8 @@ class SimulationMixin:
         self.simulator.remove_all_recordings(var=var)
 
 
-    def run(self, duration=300, prerun_time=0, truncate=True):
+    def run(self, duration=300, prerun_time=0, truncate=True, 
+            path_to_stream=None, chunk_duration=1000, reuse_prerun=False):
         """
         Run the simulation for a specified duration, optionally preceded by a prerun period
         to stabilize the model.
@@ -299,6 +433,18 @@ class SimulationMixin:
             Optional prerun period to run before the main simulation.
         truncate : bool
             Whether to truncate prerun data after the simulation.
+        path_to_stream : str, optional
+            A directory to stream the recordings to in chunks, keeping the memory 
+            use constant for long simulations. The recordings are then available 
+            as memory-mapped arrays. Default is None (keep the recordings in memory).
+        chunk_duration : float, optional
+            The duration of each chunk in ms when streaming. Default is 1000.
+        reuse_prerun : bool, optional
+            Whether to save the state of the model at the end of the prerun and
+            restore it in subsequent runs with the same prerun time instead of 
+            simulating the prerun again. The saved state is discarded when 
+            parameters are distributed or stimuli are added or removed. 
+            Requires truncate=True. Default is False.
         """
         if duration <= 0:
             raise ValueError("Simulation duration must be positive.")
@@ -307,11 +453,89 @@ class SimulationMixin:
 
         total_time = duration + prerun_time
 
+        if reuse_prerun and not truncate:
+            raise ValueError("Reusing the prerun requires truncate=True.")
+
+        stream_kwargs = {'path_to_stream': path_to_stream, 'chunk_duration': chunk_duration}
+
         if prerun_time > 0:
+            checkpoint_time = prerun_time if reuse_prerun else None
             with prerun(self, duration=prerun_time, truncate=truncate):
-                self.simulator.run(total_time)
+                self.simulator.run(total_time, checkpoint_time=checkpoint_time, **stream_kwargs)
         else:
-            self.simulator.run(duration)
+            self.simulator.run(duration, **stream_kwargs)
+
+
+    def sweep(self, conditions, duration=300, prerun_time=0, n_workers=None):
+        """
+        Run the simulation under several conditions in parallel processes.
+
+        The model is serialized (morphology, biophysics and stimuli) and
+        rebuilt once in each worker process. Each worker applies a condition,
+        runs the simulation and restores the model before the next condition.
+        The model itself is not modified.
+
+        Parameters
+        ----------
+        conditions : list[dict]
+            The conditions to run. Each condition is a dictionary with
+            any of the following keys:
+            - 'params': {param_name: value} to set a constant value for the 'all' group,
+              or {param_name: {'group_name': ..., 'distr_type': ..., **distr_params}}.
+            - 'iclamps': {segment: {'amp': ..., 'delay': ..., 'dur': ...}}
+              for existing IClamps.
+            - 'populations': {pop_name: {param_name: value}} for the input
+              or kinetic parameters of existing populations.
+        duration : float
+            Duration of the main simulation (excluding prerun).
+        prerun_time : float
+            Optional prerun period to run before the main simulation.
+        n_workers : int, optional
+            The number of worker processes. Default is the number of CPUs.
+
+        Returns
+        -------
+        list[dict]
+            For each condition, a dictionary with the time vector ('time')
+            and the recorded traces ('recordings') as {var: {segment: trace}}.
+
+        Notes
+        -----
+        Worker processes are started with the 'spawn' method, so scripts
+        calling this method must be guarded by `if __name__ == '__main__':`.
+        """
+        if duration <= 0:
+            raise ValueError("Simulation duration must be positive.")
+        if prerun_time < 0:
+            raise ValueError("Prerun time must be non-negative.")
+
+        conditions = [validate_condition(self, condition) for condition in conditions]
+        state = get_model_state(self)
+
+        with ProcessPoolExecutor(max_workers=n_workers,
+                                 mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=init_worker,
+                                 initargs=(state,)) as executor:
+            outputs = list(executor.map(
+                run_condition,
+                conditions,
+                repeat(duration, len(conditions)),
+                repeat(prerun_time, len(conditions))
+            ))
+
+        recorded_segments = {
+            var: list(recs) for var, recs in self.simulator._recordings.items()
+        }
+        return [
+            {
+                'time': output['time'],
+                'recordings': {
+                    var: dict(zip(recorded_segments[var], traces))
+                    for var, traces in output['recordings'].items()
+                },
+            }
+            for output in outputs
+        ]
 
 
     def get_traces(self):
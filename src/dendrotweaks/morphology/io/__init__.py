@@ -6,4 +6,7 @@ from dendrotweaks.morphology.io.validation import validate_tree
 from dendrotweaks.morphology.io.factories import create_point_tree
 from dendrotweaks.morphology.io.factories import create_section_tree
 from dendrotweaks.morphology.io.factories import create_segment_tree
-from dendrotweaks.morphology.io.factories import create_domains
\ No newline at end of file
+from dendrotweaks.morphology.io.factories import create_domains
+from dendrotweaks.morphology.io.cache import get_morphology_cache_key
+from dendrotweaks.morphology.io.cache import save_morphology_cache
+from dendrotweaks.morphology.io.cache import load_morphology_cache
@@ -0,0 +1,196 @@
+# SPDX-FileCopyrightText: 2025 Poirazi Lab <dendrotweaks@dendrites.gr>
+# SPDX-License-Identifier: MPL-2.0
+
+"""
+On-disk cache of processed morphologies.
+
+The cache holds the points of a standardized, extended and sorted
+point tree together with its split into sections, so that a model
+can rebuild the point and section trees without reading the SWC file
+and repeating the preprocessing.
+"""
+
+import os
+import json
+import hashlib
+import warnings
+
+import numpy as np
+
+from dendrotweaks import __version__
+from dendrotweaks.morphology.point_trees import Point, PointStore, PointTree
+from dendrotweaks.morphology.sec_trees import NeuronSection, SectionTree
+
+# Increase when the layout of the cache or the preprocessing changes
+CACHE_VERSION = 1
+
+
+def get_morphology_cache_key(path_to_swc_file, **options) -> str:
+    """
+    Get the key of the cached morphology for an SWC file.
+
+    Parameters
+    ----------
+    path_to_swc_file : str
+        The path to the SWC file.
+    **options
+        The options used to process the morphology.
+
+    Returns
+    -------
+    str
+        A hash of the content of the SWC file and the options.
+    """
+    sha = hashlib.sha256()
+    sha.update(f'{CACHE_VERSION}:{__version__}'.encode())
+    with open(path_to_swc_file, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha.update(chunk)
+    sha.update(json.dumps(options, sort_keys=True).encode())
+    return sha.hexdigest()
+
+
+def _encode_strings(values):
+    """
+    Encode a list of optional strings as unique values and codes.
+    """
+    unique_values, codes = np.unique(
+        ['' if value is None else str(value) for value in values],
+        return_inverse=True
+    )
+    return unique_values, codes
+
+
+def _decode_strings(unique_values, codes):
+    """
+    Decode the strings encoded with `_encode_strings`.
+    """
+    values = [None if value == '' else str(value) for value in unique_values]
+    return [values[code] for code in codes.tolist()]
+
+
+def save_morphology_cache(path_to_cache, sec_tree, key) -> None:
+    """
+    Save the point and section trees of a morphology to an NPZ file.
+
+    Parameters
+    ----------
+    path_to_cache : str
+        The path to the NPZ file.
+    sec_tree : SectionTree
+        The sorted section tree. Its point tree must be
+        extended and sorted.
+    key : str
+        The key of the cache (see `get_morphology_cache_key`).
+    """
+    point_tree = sec_tree._point_tree
+    points = point_tree.points
+    positions = {pt: i for i, pt in enumerate(points)}
+    rows = point_tree._rows
+
+    domain_names, domain_codes = _encode_strings([pt.domain_name for pt in points])
+    domain_colors, color_codes = _encode_strings([pt.domain_color for pt in points])
+
+    section_points = np.array(
+        [positions[pt] for sec in sec_tree.sections for pt in sec.points],
+        dtype=int
+    )
+    section_offsets = np.cumsum(
+        [0] + [len(sec.points) for sec in sec_tree.sections]
+    )
+
+    os.makedirs(os.path.dirname(path_to_cache), exist_ok=True)
+    tmp_path = f'{path_to_cache}.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez(
+            f,
+            key=np.array(key),
+            idx=np.array([pt.idx for pt in points], dtype=int),
+            coords=point_tree._store.coords[rows],
+            type_idx=point_tree._store.type_idx[rows],
+            parent_idx=point_tree._store.parent_idx[rows],
+            domain_names=domain_names,
+            domain_codes=domain_codes,
+            domain_colors=domain_colors,
+            color_codes=color_codes,
+            section_points=section_points,
+            section_offsets=section_offsets,
+            section_parents=np.array(
+                [sec.parent_idx for sec in sec_tree.sections], dtype=int
+            ),
+        )
+    os.replace(tmp_path, path_to_cache)
+
+
+def load_morphology_cache(path_to_cache, key):
+    """
+    Rebuild the point and section trees of a morphology from an NPZ file.
+
+    Parameters
+    ----------
+    path_to_cache : str
+        The path to the NPZ file.
+    key : str
+        The expected key of the cache (see `get_morphology_cache_key`).
+
+    Returns
+    -------
+    SectionTree or None
+        The section tree with a reference to its point tree,
+        or None if the cache does not exist or is outdated.
+    """
+    if not os.path.exists(path_to_cache):
+        return None
+    try:
+        with np.load(path_to_cache, allow_pickle=False) as data:
+            if str(data['key']) != key:
+                return None
+            data = dict(data)
+    except (OSError, ValueError, KeyError) as e:
+        warnings.warn(f'Could not read the morphology cache {path_to_cache}: {e}')
+        return None
+
+    store = PointStore(capacity=len(data['idx']))
+    rows = store.extend(data['coords'], data['type_idx'], data['parent_idx'])
+    domain_names = _decode_strings(data['domain_names'], data['domain_codes'])
+    domain_colors = _decode_strings(data['domain_colors'], data['color_codes'])
+    points = [
+        Point._from_row(store, row, idx,
+                        domain_name=domain_name, domain_color=domain_color)
+        for row, idx, domain_name, domain_color in zip(
+            rows.tolist(), data['idx'].tolist(), domain_names, domain_colors)
+    ]
+
+    # The tree is sorted, so the parent index of a point is its position
+    # and the children of each point are visited in the order of the points
+    for pt, parent_idx in zip(points, data['parent_idx'].tolist()):
+        if parent_idx >= 0:
+            parent = points[parent_idx]
+            pt.parent = parent
+            parent.children.append(pt)
+
+    point_tree = PointTree(points)
+    point_tree._is_extended = True
+
+    sections = []
+    offsets = data['section_offsets'].tolist()
+    section_points = data['section_points'].tolist()
+    for i, parent_idx in enumerate(data['section_parents'].tolist()):
+        section = NeuronSection(
+            idx=i,
+            parent_idx=parent_idx,
+            points=[points[j] for j in section_points[offsets[i]:offsets[i + 1]]]
+        )
+        for pt in section.points:
+            pt._section = section
+        if parent_idx >= 0:
+            # The points of the section are already connected
+            parent = sections[parent_idx]
+            section.parent = parent
+            parent.children.append(section)
+        sections.append(section)
+
+    sec_tree = SectionTree(sections)
+    sec_tree._point_tree = point_tree
+
+    return sec_tree
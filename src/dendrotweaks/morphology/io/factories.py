@@ -2,7 +2,7 @@
 # SPDX-License-Identifier: MPL-2.0
 
 from dendrotweaks.morphology.trees import Node, Tree
-from dendrotweaks.morphology.point_trees import Point, PointTree
+from dendrotweaks.morphology.point_trees import Point, PointStore, PointTree
 from dendrotweaks.morphology.sec_trees import NeuronSection, Section, SectionTree
 from dendrotweaks.morphology.seg_trees import NeuronSegment, Segment, SegmentTree
 from dendrotweaks.morphology.domains import Domain
@@ -11,6 +11,7 @@ from dendrotweaks.morphology.io.reader import SWCReader
 
 from typing import List, Union
 from pandas import DataFrame, isna
+import numpy as np
 
 from dendrotweaks.morphology.io.validation import validate_tree
 
@@ -38,20 +39,84 @@ def create_point_tree(source: Union[str, DataFrame]) -> PointTree:
     else:
         raise ValueError("Source must be a file path (str) or a DataFrame.")
 
+    indices = df['Index'].to_numpy(dtype=int)
+    parent_indices = df['Parent'].to_numpy(dtype=int)
+    parent_positions = _get_parent_positions(indices, parent_indices)
+
+    store = PointStore(capacity=len(df))
+    rows = store.extend(
+        df[['X', 'Y', 'Z', 'R']].to_numpy(dtype=float),
+        df['Type'].to_numpy(dtype=int),
+        parent_indices
+    )
+    domain_names = [None if isna(name) else name for name in df['Domain'].tolist()]
+    domain_colors = [None if isna(color) else color for color in df['Color'].tolist()]
     nodes = [
-        Point(row.Index, row.Type, 
-              row.X, row.Y, row.Z, row.R, row.Parent, 
-              domain_name=None if isna(row.Domain) else row.Domain,
-              domain_color=None if isna(row.Color) else row.Color
-              )
-        for row in df.itertuples(index=False)
+        Point._from_row(store, row, idx, 
+                        domain_name=domain_name, domain_color=domain_color)
+        for row, idx, domain_name, domain_color in zip(
+            rows.tolist(), indices.tolist(), domain_names, domain_colors)
     ]
+    # The children of each point are kept in the order of the SWC table
+    for node, parent_position in zip(nodes, parent_positions.tolist()):
+        if parent_position >= 0:
+            parent = nodes[parent_position]
+            node.parent = parent
+            parent.children.append(node)
+
     point_tree =  PointTree(nodes)
     point_tree.remove_overlaps()
 
     return point_tree
 
 
+def _get_parent_positions(indices, parent_indices):
+    """
+    Find the position of the parent of each point in the SWC table.
+
+    Parameters
+    ----------
+    indices : np.ndarray
+        The index of each point.
+    parent_indices : np.ndarray
+        The index of the parent of each point (-1 for the root).
+
+    Returns
+    -------
+    np.ndarray
+        The position of the parent of each point (-1 for the root).
+
+    Raises
+    ------
+    ValueError
+        If the points do not form a single tree connected to one root.
+    """
+    is_root = parent_indices == -1
+    if np.count_nonzero(is_root) != 1:
+        raise ValueError(f'Tree must have exactly one root node. Found: {indices[is_root].tolist()}')
+
+    order = np.argsort(indices, kind='stable')
+    sorted_indices = indices[order]
+    found = np.searchsorted(sorted_indices, parent_indices)
+    found = np.minimum(found, len(indices) - 1)
+    has_parent = sorted_indices[found] == parent_indices
+    if not np.all(has_parent | is_root):
+        raise ValueError('Tree is not connected.')
+    parent_positions = np.where(is_root, -1, order[found])
+
+    # Every point must reach the root by following its parents.
+    # Jumping to the ancestor twice as far at each step takes
+    # a logarithmic number of steps in the depth of the tree
+    root_position = np.flatnonzero(is_root)[0]
+    ancestors = np.where(is_root, root_position, parent_positions)
+    for _ in range(int(np.log2(len(indices))) + 2):
+        ancestors = ancestors[ancestors]
+    if not np.all(ancestors == root_position):
+        raise ValueError('Tree is not connected.')
+
+    return parent_positions
+
+
 def create_section_tree(point_tree: PointTree):
     """
     Create a section tree from a point tree.
@@ -84,15 +149,15 @@ def _split_to_sections(point_tree: PointTree) -> List[Section]:
     """
     sections = []
 
-    bifurcation_children = [
-        child for b in point_tree.bifurcations for child in b.children]
-    bifurcation_children = [point_tree.root] + bifurcation_children
+    bifurcation_children = {
+        child for b in point_tree.bifurcations for child in b.children}
+    bifurcation_children.add(point_tree.root)
     # Filter out the bifurcation children to enforce the original order
-    bifurcation_children = [node for node in point_tree._nodes 
-                            if node in bifurcation_children]
+    section_roots = [node for node in point_tree._nodes 
+                     if node in bifurcation_children]
 
     # Assign a section to each bifurcation child
-    for i, child in enumerate(bifurcation_children):
+    for i, child in enumerate(section_roots):
         section = NeuronSection(idx=i, parent_idx=-1, points=[child])
         sections.append(section)
         child._section = section
@@ -164,7 +229,7 @@ def _merge_soma(sections: List[Section], point_tree: PointTree):
     return kept_sections
 
 
-def create_segment_tree(sec_tree):
+def create_segment_tree(sec_tree, keep_sections=None):
     """
     Create a segment tree from a section tree.
 
@@ -172,6 +237,10 @@ def create_segment_tree(sec_tree):
     ----------
     sec_tree : SectionTree
         The section tree to create the segment tree from by splitting it into segments.
+    keep_sections : set[Section], optional
+        The sections whose existing segments are reused (and re-indexed) 
+        instead of being recreated. Their number of segments must not have 
+        changed. Default is None (create all segments).
 
     Returns
     -------
@@ -179,7 +248,7 @@ def create_segment_tree(sec_tree):
         The segment tree representing spatial discretization of the neuron morphology for numerical simulations.
     """
 
-    segments = _create_segments(sec_tree)
+    segments = _create_segments(sec_tree, keep_sections or set())
 
     seg_tree = SegmentTree(segments)
     sec_tree._seg_tree = seg_tree
@@ -187,7 +256,7 @@ def create_segment_tree(sec_tree):
     return seg_tree
 
 
-def _create_segments(sec_tree) -> List[Segment]:
+def _create_segments(sec_tree, keep_sections=()) -> List[Segment]:
     """
     Create a list of Segment objects from a SectionTree object.
     """
@@ -196,10 +265,19 @@ def _create_segments(sec_tree) -> List[Segment]:
     # TODO: Refactor this to use a stack instead of recursion
     def add_segments(sec, parent_idx, idx_counter):
         segs = {seg: idx + idx_counter for idx, seg in enumerate(sec._ref)}
+        old_segments = sec.segments if sec in keep_sections else None
         sec.segments = []
-        for seg, idx in segs.items():
-            segment = NeuronSegment(
-                idx=idx, parent_idx=parent_idx, sim_seg=seg, section=sec)
+        for i, (seg, idx) in enumerate(segs.items()):
+            if old_segments is None:
+                segment = NeuronSegment(
+                    idx=idx, parent_idx=parent_idx, sim_seg=seg, section=sec)
+            else:
+                # Detach the segment from the previous tree
+                segment = old_segments[i]
+                segment.children = []
+                segment.parent = None
+                segment.idx = idx
+                segment.parent_idx = parent_idx
             segments.append(segment)
             sec.segments.append(segment)
 
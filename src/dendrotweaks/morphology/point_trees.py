@@ -4,6 +4,7 @@
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
 
 from scipy.spatial.transform import Rotation
 
@@ -14,13 +15,171 @@ from dendrotweaks.morphology.trees import Node, Tree
 from dendrotweaks.utils import timeit
 
 from contextlib import contextmanager
+from functools import cached_property
 import random
 
 
+COORDINATE_COLUMNS = {'x': 0, 'y': 1, 'z': 2, 'r': 3}
+
+
+class PointStore():
+    """
+    A columnar store of the coordinates, radii, types and parent 
+    indices of the points in a morphological reconstruction.
+
+    Each point occupies one row of the store. Rows are only appended, 
+    so removed points leave unused rows behind until the store is 
+    compacted by the tree that owns it.
+
+    Parameters
+    ----------
+    capacity : int, optional
+        The number of rows to preallocate, by default 0.
+
+    Attributes
+    ----------
+    coords : np.ndarray
+        A (capacity, 4) array with the x, y, z coordinates and the radius of each row.
+    type_idx : np.ndarray
+        The SWC type of each row (-1 if the type is not set).
+    parent_idx : np.ndarray
+        The index of the parent point of each row.
+    size : int
+        The number of rows in use.
+    """
+
+    def __init__(self, capacity: int = 0) -> None:
+        self.coords = np.empty((capacity, 4), dtype=float)
+        self.type_idx = np.empty(capacity, dtype=int)
+        self.parent_idx = np.empty(capacity, dtype=int)
+        self.size = 0
+
+    def __repr__(self):
+        return f"PointStore(size={self.size})"
+
+    def __len__(self):
+        return self.size
+
+    def _reserve(self, n_rows):
+        """
+        Make room for `n_rows` more rows, growing the arrays geometrically.
+        """
+        required = self.size + n_rows
+        capacity = len(self.coords)
+        if required <= capacity:
+            return
+        capacity = max(required, 2 * capacity)
+        coords = np.empty((capacity, 4), dtype=float)
+        type_idx = np.empty(capacity, dtype=int)
+        parent_idx = np.empty(capacity, dtype=int)
+        coords[:self.size] = self.coords[:self.size]
+        type_idx[:self.size] = self.type_idx[:self.size]
+        parent_idx[:self.size] = self.parent_idx[:self.size]
+        self.coords, self.type_idx, self.parent_idx = coords, type_idx, parent_idx
+
+    def add(self, x, y, z, r, type_idx, parent_idx) -> int:
+        """
+        Append a row to the store.
+
+        Returns
+        -------
+        int
+            The index of the new row.
+        """
+        self._reserve(1)
+        row = self.size
+        self.coords[row] = (x, y, z, r)
+        self.type_idx[row] = -1 if type_idx is None else type_idx
+        self.parent_idx[row] = parent_idx
+        self.size += 1
+        return row
+
+    def extend(self, coords, type_idx, parent_idx) -> np.ndarray:
+        """
+        Append several rows to the store at once.
+
+        Parameters
+        ----------
+        coords : array_like
+            A (n, 4) array with the x, y, z coordinates and the radius of each row.
+        type_idx : array_like
+            The SWC type of each row.
+        parent_idx : array_like
+            The index of the parent point of each row.
+
+        Returns
+        -------
+        np.ndarray
+            The indices of the new rows.
+        """
+        coords = np.asarray(coords, dtype=float).reshape(-1, 4)
+        n_rows = len(coords)
+        self._reserve(n_rows)
+        rows = np.arange(self.size, self.size + n_rows)
+        self.coords[rows] = coords
+        self.type_idx[rows] = type_idx
+        self.parent_idx[rows] = parent_idx
+        self.size += n_rows
+        return rows
+
+    def take(self, rows):
+        """
+        Create a new store holding only the given rows, in the given order.
+        """
+        store = PointStore()
+        store.coords = self.coords[rows]
+        store.type_idx = self.type_idx[rows]
+        store.parent_idx = self.parent_idx[rows]
+        store.size = len(rows)
+        return store
+
+
+def _coordinate_property(name):
+    """
+    A property that reads and writes a column of the point's store.
+    """
+    col = COORDINATE_COLUMNS[name]
+
+    def getter(self):
+        return float(self._store.coords[self._row, col])
+
+    def setter(self, value):
+        self._store.coords[self._row, col] = value
+
+    return property(getter, setter, doc=f"The {name} value of the point.")
+
+
+def get_coordinates(points) -> np.ndarray:
+    """
+    Get the coordinates and radii of a sequence of points.
+
+    Parameters
+    ----------
+    points : list[Point]
+        The points to get the coordinates of.
+
+    Returns
+    -------
+    np.ndarray
+        A (n, 4) array with the x, y, z coordinates and the radius of each point.
+    """
+    if not points:
+        return np.empty((0, 4), dtype=float)
+    store = points[0]._store
+    if all(pt._store is store for pt in points):
+        rows = np.fromiter((pt._row for pt in points), dtype=int, count=len(points))
+        return store.coords[rows]
+    return np.array([[pt.x, pt.y, pt.z, pt.r] for pt in points], dtype=float)
+
+
 class Point(Node):
     """
     A class representing a single point in a morphological reconstruction.
 
+    The coordinates, radius, type and parent index of the point 
+    are kept in a row of a `PointStore`, which is shared by all 
+    the points of a `PointTree`. The point itself is a view of that row.
+
     Parameters
     ----------
     idx : str
@@ -37,6 +196,10 @@ class Point(Node):
         The radius of the node.
     parent_idx : str
         The identifier of the parent node.
+    store : PointStore, optional
+        The store to add the point to. If None, a new store is created 
+        for the point and the point is moved to the store of the tree 
+        when it is added to one.
 
     Attributes
     ----------
@@ -58,18 +221,62 @@ class Point(Node):
 
     def __init__(self, idx: str, type_idx: int, 
                  x: float, y: float, z: float, r: float, parent_idx: str, 
-                 domain_name: str, domain_color: str) -> None:
+                 domain_name: str, domain_color: str, 
+                 store: PointStore = None) -> None:
+        self._store = store if store is not None else PointStore(capacity=1)
+        self._row = self._store.add(x, y, z, r, int(type_idx), int(parent_idx))
         super().__init__(idx, parent_idx)
-        self.type_idx = int(type_idx)
-        self.x = x
-        self.y = y
-        self.z = z
-        self.r = r
         self.domain_name = domain_name
         self.domain_color = domain_color
         self._section = None
 
 
+    @classmethod
+    def _from_row(cls, store, row, idx, domain_name=None, domain_color=None):
+        """
+        Create a point as a view of an existing row of a store.
+        """
+        pt = cls.__new__(cls)
+        pt._store = store
+        pt._row = row
+        Node.__init__(pt, idx, store.parent_idx[row])
+        pt.domain_name = domain_name
+        pt.domain_color = domain_color
+        pt._section = None
+        return pt
+
+
+    x = _coordinate_property('x')
+    y = _coordinate_property('y')
+    z = _coordinate_property('z')
+    r = _coordinate_property('r')
+
+
+    @property
+    def type_idx(self):
+        """
+        The type of the node according to the SWC specification.
+        """
+        type_idx = int(self._store.type_idx[self._row])
+        return None if type_idx < 0 else type_idx
+
+    @type_idx.setter
+    def type_idx(self, value):
+        self._store.type_idx[self._row] = -1 if value is None else int(value)
+
+
+    @property
+    def parent_idx(self):
+        """
+        The identifier of the parent node.
+        """
+        return int(self._store.parent_idx[self._row])
+
+    @parent_idx.setter
+    def parent_idx(self, value):
+        self._store.parent_idx[self._row] = value
+
+
     @property
     def distance_to_parent(self):
         # TODO: could this be cached?
@@ -121,7 +328,8 @@ class Point(Node):
         """
         new_node = Point(self.idx, self.type_idx, 
                          self.x, self.y, self.z, self.r, self.parent_idx,
-                         self.domain_name, self.domain_color)
+                         self.domain_name, self.domain_color, 
+                         store=self._store)
         return new_node
 
 
@@ -148,6 +356,10 @@ class PointTree(Tree):
     """
     A class representing a tree graph of points in a morphological reconstruction.
 
+    The coordinates, radii, types and parent indices of the points
+    are kept in a single `PointStore`, so that geometric transformations 
+    of the tree are applied to all points at once.
+
     Parameters
     ----------
     nodes : list[Point]
@@ -155,6 +367,7 @@ class PointTree(Tree):
     """
 
     def __init__(self, nodes: list[Point]) -> None:
+        self._store = self._collect_store(nodes)
         super().__init__(nodes)
         self._sections = []
         self._is_extended = False
@@ -164,6 +377,72 @@ class PointTree(Tree):
         return f"PointTree(root={self.root!r}, num_nodes={len(self._nodes)})"
 
 
+    # STORE METHODS
+
+    @staticmethod
+    def _collect_store(nodes):
+        """
+        Get the store shared by the nodes, moving them 
+        into a new store if they do not share one.
+        """
+        if not nodes:
+            return PointStore()
+        store = nodes[0]._store
+        if all(pt._store is store for pt in nodes):
+            return store
+        coords = get_coordinates(nodes)
+        store = PointStore(capacity=len(nodes))
+        rows = store.extend(
+            coords,
+            [-1 if pt.type_idx is None else pt.type_idx for pt in nodes],
+            [pt.parent_idx for pt in nodes]
+        )
+        for pt, row in zip(nodes, rows):
+            pt._store, pt._row = store, int(row)
+        return store
+
+    @cached_property
+    def _rows(self):
+        """
+        The rows of the store that hold the points of the tree, 
+        in the order of the points. Points added to the tree from 
+        another store are moved to the store of the tree.
+        """
+        store = self._store
+        for pt in self._nodes:
+            if pt._store is not store:
+                pt._row = store.add(pt.x, pt.y, pt.z, pt.r, pt.type_idx, pt.parent_idx)
+                pt._store = store
+        return np.fromiter((pt._row for pt in self._nodes), 
+                           dtype=int, count=len(self._nodes))
+
+    @property
+    def coords(self):
+        """
+        A (n, 4) array with the x, y, z coordinates and 
+        the radius of each point, in the order of the points.
+        """
+        return self._store.coords[self._rows]
+
+    @coords.setter
+    def coords(self, value):
+        self._store.coords[self._rows] = value
+
+    def _invalidate_topology_cache(self):
+        """Call after modifying the topology of the tree to invalidate cached properties."""
+        self.__dict__.pop('_rows', None)
+
+    def _compact_store(self):
+        """
+        Replace the store with one that holds only the points 
+        of the tree, in the order of the points.
+        """
+        store = self._store.take(self._rows)
+        for row, pt in enumerate(self._nodes):
+            pt._store, pt._row = store, row
+        self._store = store
+        self._invalidate_topology_cache()
+
     # PROPERTIES
 
     @property
@@ -182,27 +461,32 @@ class PointTree(Tree):
         """
         The list of points representing the soma (type 1).
         """
-        return [pt for pt in self.points if pt.type_idx == 1]
+        is_soma = self._store.type_idx[self._rows] == 1
+        return [pt for pt, keep in zip(self.points, is_soma) if keep]
+
+    def _type_center(self, type_idx):
+        """
+        The average of the coordinates of the points of the given type.
+        """
+        rows = self._rows
+        rows = rows[self._store.type_idx[rows] == type_idx]
+        if len(rows) == 0:
+            return None
+        return self._store.coords[rows, :3].mean(axis=0)
 
     @property
     def soma_center(self):
         """
         The center of the soma as the average of the coordinates of the soma points.
         """
-        return np.mean([[pt.x, pt.y, pt.z] 
-                        for pt in self.soma_points], axis=0)
+        return self._type_center(1)
 
     @property
     def apical_center(self):
         """
         The center of the apical dendrite as the average of the coordinates of the apical points.
         """
-        apical_points = [pt for pt in self.points 
-                        if pt.type_idx == 4]
-        if len(apical_points) == 0:
-            return None
-        return np.mean([[pt.x, pt.y, pt.z] 
-                       for pt in apical_points], axis=0)
+        return self._type_center(4)
 
     @property
     def soma_notation(self):
@@ -213,11 +497,12 @@ class PointTree(Tree):
         - '3PS': Three-point soma
         - 'contour': Soma represented as a contour
         """
-        if len(self.soma_points) == 1:
+        n_soma_points = np.count_nonzero(self._store.type_idx[self._rows] == 1)
+        if n_soma_points == 1:
             return '1PS'
-        elif len(self.soma_points) == 2:
+        elif n_soma_points == 2:
             return '2PS'
-        elif len(self.soma_points) == 3:
+        elif n_soma_points == 3:
             return '3PS'
         else:
             return 'contour'
@@ -227,16 +512,18 @@ class PointTree(Tree):
         """
         A DataFrame representation of the tree.
         """
+        rows = self._rows
+        coords = self._store.coords[rows]
         data = {
             'idx': [node.idx for node in self._nodes],
             'type_idx': [node.type_idx for node in self._nodes],
             'domain_name': [node.domain_name for node in self._nodes],
             'domain_color': [node.domain_color for node in self._nodes],
-            'x': [node.x for node in self._nodes],
-            'y': [node.y for node in self._nodes],
-            'z': [node.z for node in self._nodes],
-            'r': [node.r for node in self._nodes],
-            'parent_idx': [node.parent_idx for node in self._nodes]
+            'x': coords[:, 0],
+            'y': coords[:, 1],
+            'z': coords[:, 2],
+            'r': coords[:, 3],
+            'parent_idx': self._store.parent_idx[rows]
         }
         return pd.DataFrame(data)
 
@@ -263,7 +550,8 @@ class PointTree(Tree):
                 r=pt.r,
                 parent_idx=pt.idx,
                 domain_name=pt.domain_name,
-                domain_color=pt.domain_color)
+                domain_color=pt.domain_color,
+                store=self._store)
 
             pt_right = Point(
                 idx=3,
@@ -274,7 +562,8 @@ class PointTree(Tree):
                 r=pt.r,
                 parent_idx=pt.idx,
                 domain_name=pt.domain_name,
-                domain_color=pt.domain_color)
+                domain_color=pt.domain_color,
+                store=self._store)
 
             self.add_subtree(pt_right, pt)
             self.add_subtree(pt_left, pt)
@@ -301,21 +590,15 @@ class PointTree(Tree):
         decimals : int, optional
             The number of decimals to round to, by default
         """
-        for pt in self.points:
-            pt.x = round(pt.x, decimals)
-            pt.y = round(pt.y, decimals)
-            pt.z = round(pt.z, decimals)
-            pt.r = round(pt.r, decimals)
+        self.coords = np.round(self.coords, decimals)
 
     def shift_coordinates_to_soma_center(self):
         """
         Shift all coordinates so that the soma center is at the origin (0, 0, 0).
         """
-        soma_x, soma_y, soma_z = self.soma_center
-        for pt in self.points:
-            pt.x = round(pt.x - soma_x, 8)
-            pt.y = round(pt.y - soma_y, 8)
-            pt.z = round(pt.z - soma_z, 8)
+        coords = self.coords
+        coords[:, :3] = np.round(coords[:, :3] - self.soma_center, 8)
+        self.coords = coords
 
     @timeit
     def rotate(self, angle_deg, axis='Y'):
@@ -356,18 +639,18 @@ class PointTree(Tree):
             raise ValueError("Axis must be 'X', 'Y', or 'Z'")
 
         # Subtract rotation point to translate the cloud to the origin
-        coords = np.array([[pt.x, pt.y, pt.z] for pt in self.points])
-        coords -= rotation_point
+        coords = self.coords
+        xyz = coords[:, :3] - rotation_point
 
         # Apply rotation
-        rotated_coords = np.dot(coords, rotation_matrix.T)
+        rotated_coords = np.dot(xyz, rotation_matrix.T)
 
         # Translate back to the original position
         rotated_coords += rotation_point
 
         # Update the coordinates of the points
-        for pt, (x, y, z) in zip(self._nodes, rotated_coords):
-            pt.x, pt.y, pt.z = x, y, z
+        coords[:, :3] = rotated_coords
+        self.coords = coords
 
     def align_apical_dendrite(self, axis='Y', facing='up'):
         """
@@ -414,11 +697,31 @@ class PointTree(Tree):
         # Create the rotation matrix
         rotation_matrix = Rotation.from_rotvec(rotation_angle * rotation_vector / np.linalg.norm(rotation_vector)).as_matrix()
 
-        # Apply the rotation to each point
-        for pt in self.points:
-            coords = np.array([pt.x, pt.y, pt.z]) - soma_center
-            rotated_coords = np.dot(rotation_matrix, coords) + soma_center
-            pt.x, pt.y, pt.z = rotated_coords
+        # Apply the rotation to all points
+        coords = self.coords
+        coords[:, :3] = np.dot(coords[:, :3] - soma_center, rotation_matrix.T) + soma_center
+        self.coords = coords
+
+
+    # SORTING METHODS
+
+    def sort(self, sort_children=True, force=False):
+        """
+        Sort the points in the tree using a stack-based depth-first traversal
+        and reorder the store so that its rows follow the order of the points.
+
+        Parameters
+        ----------
+        sort_children : bool, optional
+            Whether to sort the children of each node 
+            based on the number of bifurcations in their subtrees. Defaults to True.
+        force : bool, optional
+            Whether to force the sorting of the tree even if it is already sorted. Defaults to False.
+        """
+        if self.is_sorted and not force:
+            return
+        super().sort(sort_children=sort_children, force=True)
+        self._compact_store()
 
 
     # I/O METHODS
@@ -428,12 +731,22 @@ class PointTree(Tree):
         """
         n_nodes_before = len(self.points)
 
-        overlapping_nodes = [
-            pt for pt in self.traverse() 
-            if pt.parent is not None and pt.overlaps_with(pt.parent)
-        ]
-        for pt in overlapping_nodes:
-            self.remove_node(pt)
+        # Compare each point with its parent at once
+        positions = {pt: i for i, pt in enumerate(self._nodes)}
+        parent_positions = np.array([
+            positions[pt.parent] if pt.parent is not None else i
+            for i, pt in enumerate(self._nodes)
+        ], dtype=int)
+        xyz = self.coords[:, :3]
+        overlaps = np.isclose(xyz, xyz[parent_positions]).all(axis=1)
+        overlaps &= parent_positions != np.arange(len(self._nodes))
+
+        if overlaps.any():
+            overlapping = {pt for pt, overlap in zip(self._nodes, overlaps) if overlap}
+            for pt in [pt for pt in self.traverse() if pt in overlapping]:
+                self._detach_node(pt)
+            self._nodes = [pt for pt in self._nodes if pt not in overlapping]
+            self._invalidate_topology_cache()
 
         self._is_extended = False
         n_nodes_after = len(self.points)
@@ -457,6 +770,7 @@ class PointTree(Tree):
             b for b in self.bifurcations if b != self.root
         ]
 
+        new_nodes = []
         for pt in bifurcations_excluding_root:
             children = pt.children[:]
             for child in children:
@@ -470,8 +784,11 @@ class PointTree(Tree):
                     new_node._section = child._section
                     if not new_node in new_node._section.points:
                         new_node._section.points[0] = new_node
-                self.insert_node_before(new_node, child)
+                self._attach_node_before(new_node, child)
+                new_nodes.append(new_node)
 
+        self._nodes.extend(new_nodes)
+        self._invalidate_topology_cache()
         self._is_extended = True
         n_nodes_after = len(self.points)
         print(f'Extended {n_nodes_after - n_nodes_before} nodes.')
@@ -571,18 +888,22 @@ class PointTree(Tree):
         points_to_plot = self.points if focus_nodes is None else [pt for pt in self.points if pt in focus_nodes]
 
         # Extract coordinates for projection
-        coords = {axis: [getattr(pt, axis.lower()) for pt in points_to_plot] for axis in "XYZ"}
+        xyz = get_coordinates(points_to_plot)
+        coords = {axis: xyz[:, COORDINATE_COLUMNS[axis.lower()]] for axis in "XYZ"}
 
         # Draw edges efficiently
         if show_edges:
             point_set = set(points_to_plot)  # Convert list to set for fast lookup
-            for pt1, pt2 in self.edges:
-                if pt1 in point_set and pt2 in point_set:
-                    ax.plot(
-                        [getattr(pt1, projection[0].lower()), getattr(pt2, projection[0].lower())],
-                        [getattr(pt1, projection[1].lower()), getattr(pt2, projection[1].lower())],
-                        color='C1'
-                    )
+            edges = [(pt1, pt2) for pt1, pt2 in self.edges 
+                     if pt1 in point_set and pt2 in point_set]
+            if edges:
+                cols = [COORDINATE_COLUMNS[axis.lower()] for axis in projection[:2]]
+                starts = get_coordinates([pt1 for pt1, _ in edges])[:, cols]
+                ends = get_coordinates([pt2 for _, pt2 in edges])[:, cols]
+                ax.add_collection(LineCollection(
+                    np.stack([starts, ends], axis=1), colors='C1'
+                ))
+                ax.autoscale_view()
 
         # Assign colors based on domains
         if show_domains:
@@ -11,6 +11,7 @@ from typing import Callable, List
 from neuron import h
 
 from dendrotweaks.morphology.trees import Node, Tree
+from dendrotweaks.morphology.point_trees import get_coordinates
 from dendrotweaks.morphology.domains import Domain
 from dataclasses import dataclass, field
 from bisect import bisect_left
@@ -74,21 +75,18 @@ class Section(Node):
     def __call__(self, x: float):
         """
         Return the segment at a given position.
+
+        As in NEURON, a position x belongs to the segment int(x * nseg).
+        The positions 0 and 1 belong to the first and the last segment.
         """
         if self._ref is None:
             raise ValueError('Section is not referenced in NEURON.')
         if x < 0 or x > 1:
             raise ValueError('Location x must be in the range [0, 1].')
-        elif x == 0: 
-            # TODO: Decide how to handle sec(0) and sec(1)
-            # as they are not shown in the seg_graph
-            return self.segments[0]
-        elif x == 1:
-            return self.segments[-1]
-        matching_segs = [self._ref(x) == seg._ref for seg in self.segments]
-        if any(matching_segs):
-            return self.segments[matching_segs.index(True)]
-        raise ValueError(f'No segment found at location {x}')
+        nseg = len(self.segments)
+        if nseg == 0:
+            raise ValueError(f'No segment found at location {x}')
+        return self.segments[min(int(x * nseg), nseg - 1)]
         
 
     def __iter__(self):
@@ -143,12 +141,21 @@ class Section(Node):
                             'parent_idx': [self.parent_idx]})
 
 
+    @property
+    def coords(self):
+        """
+        A (n, 4) array with the x, y, z coordinates and 
+        the radius of the points in the section.
+        """
+        return get_coordinates(self.points)
+
+
     @property
     def radii(self):
         """
         Radii of the points in the section.
         """
-        return [pt.r for pt in self.points]
+        return self.coords[:, 3].tolist()
 
 
     @property
@@ -156,7 +163,7 @@ class Section(Node):
         """
         Diameters of the points in the section.
         """
-        return [2 * pt.r for pt in self.points]
+        return (2 * self.coords[:, 3]).tolist()
 
 
     @property
@@ -164,7 +171,7 @@ class Section(Node):
         """
         X-coordinates of the points in the section.
         """
-        return [pt.x for pt in self.points]
+        return self.coords[:, 0].tolist()
 
 
     @property
@@ -172,7 +179,7 @@ class Section(Node):
         """
         Y-coordinates of the points in the section.
         """
-        return [pt.y for pt in self.points]
+        return self.coords[:, 1].tolist()
 
 
     @property
@@ -180,7 +187,7 @@ class Section(Node):
         """
         Z-coordinates of the points in the section.
         """
-        return [pt.z for pt in self.points]
+        return self.coords[:, 2].tolist()
 
 
     def get_location_coordinates(self, loc):
@@ -263,7 +270,7 @@ class Section(Node):
         """
         The list of cumulative euclidean distances of the points in the section.
         """
-        coords = np.array([[pt.x, pt.y, pt.z] for pt in self.points])
+        coords = self.coords[:, :3]
         deltas = np.diff(coords, axis=0)
         frusta_distances = np.sqrt(np.sum(deltas**2, axis=1))
         cumulative_frusta_distances = np.insert(np.cumsum(frusta_distances), 0, 0)
@@ -275,7 +282,7 @@ class Section(Node):
         """
         The coordinates of the center of the section.
         """
-        return np.mean(self.xs), np.mean(self.ys), np.mean(self.zs)
+        return tuple(self.coords[:, :3].mean(axis=0))
 
 
     @cached_property
@@ -291,17 +298,23 @@ class Section(Node):
         """
         The surface area of the section calculated as the sum of the areas of the frusta segments.
         """
-        areas = [np.pi * (r1 + r2) * np.sqrt((r1 - r2)**2 + h**2) for r1, r2, h in zip(self.radii[:-1], self.radii[1:], np.diff(self.distances))]
-        return sum(areas)
+        coords = self.coords
+        radii = coords[:, 3]
+        heights = np.sqrt(np.sum(np.diff(coords[:, :3], axis=0)**2, axis=1))
+        r1, r2 = radii[:-1], radii[1:]
+        return np.sum(np.pi * (r1 + r2) * np.sqrt((r1 - r2)**2 + heights**2))
 
 
     def _invalidate_geometry_cache(self):
         """Call after modifying the geometry of the section to invalidate cached properties."""
         self.__dict__.pop('length', None)
+        # Path distances of the whole tree depend on the section length
+        self._invalidate_topology_cache()
 
     def _invalidate_topology_cache(self):
-        """Call after modifying the geometry of the section to invalidate cached properties."""
-        self.__dict__.pop('path_distance_to_root', None)
+        """Call after modifying the topology of the section to invalidate cached properties."""
+        if self._tree is not None:
+            self._tree._invalidate_topology_cache()
 
     # MECHANISM METHODS
 
@@ -372,16 +385,22 @@ class Section(Node):
         return distance
 
 
-    @cached_property
+    @property
     def path_distance_to_root(self) -> float:
         """
         Calculate the total distance from the section start to the root.
+        Read from the path distances precomputed for the whole tree
+        when the section belongs to one.
 
         Returns
         -------
         float
             The distance from the section start to the root.
         """
+        if self._tree is not None:
+            positions, _, to_root, _ = self._tree._path_distance_offsets
+            if self in positions:
+                return float(to_root[positions[self]])
         path = self.path_to_ancestor(include_self=False, include_ancestor=False)
         return sum(sec.length for sec in path)
 
@@ -506,16 +525,24 @@ class Section(Node):
                 relative_position_other = 0
             return abs(relative_position_other - relative_position) * self.length
         
-        # Get path between sections (excluding both endpoints and common ancestor)
-        path = self.path(other, 
-                        include_self=False,
-                        include_other=False,
-                        include_ancestor=False)
-        
-        path_length = sum(sec.length for sec in path)
+        if self._tree is not None and self._tree._has_lca_index_for(self, other):
+            # Use the precomputed offsets and the LCA index of the tree
+            common_ancestor = self._tree.lowest_common_ancestor(self, other)
+            path_length = self._tree._path_length_between(self, other, common_ancestor)
+            self_is_ancestor = common_ancestor is self
+            other_is_ancestor = common_ancestor is other
+        else:
+            # Get path between sections (excluding both endpoints and common ancestor)
+            path = self.path(other, 
+                            include_self=False,
+                            include_other=False,
+                            include_ancestor=False)
+            path_length = sum(sec.length for sec in path)
+            self_is_ancestor = self in other.ancestors
+            other_is_ancestor = other in self.ancestors
         
         # Add contribution from self
-        if self in other.ancestors:
+        if self_is_ancestor:
             # If self is an ancestor of other, traverse backwards from self
             if relative_position is None:
                 relative_position = 1
@@ -527,7 +554,7 @@ class Section(Node):
             path_length += relative_position * self.length
         
         # Add contribution from other
-        if other in self.ancestors:
+        if other_is_ancestor:
             # If other is an ancestor of self, traverse backwards from other
             if relative_position_other is None:
                 relative_position_other = 1
@@ -547,6 +574,7 @@ class Section(Node):
         """
         # In SectionTree
         super().disconnect_from_parent()
+        self._invalidate_topology_cache()
         # In NEURON
         if self._ref:
             h.disconnect(sec=self._ref) #from parent
@@ -568,6 +596,7 @@ class Section(Node):
         """
         # In SectionTree
         super().connect_to_parent(parent)
+        self._invalidate_topology_cache()
         # In NEURON
         if self._ref:
             if self.parent is not None:
@@ -639,9 +668,7 @@ class Section(Node):
             section_color = self.domain_color
         
         # Extract coordinates
-        xs = np.array([p.x for p in self.points])
-        ys = np.array([p.y for p in self.points])
-        zs = np.array([p.z for p in self.points])
+        xs, ys, zs = self.coords[:, :3].T
         
         # Plot section projections
         self._plot_projection(ax_xz, xs, zs, 'X', 'Z', 'XZ Projection', 
@@ -657,9 +684,7 @@ class Section(Node):
         # Plot parent section if requested
         if plot_parent and self.parent:
             # Only plot parent projections, radii are handled in _plot_radii_distribution
-            parent_xs = np.array([p.x for p in self.parent.points])
-            parent_ys = np.array([p.y for p in self.parent.points])
-            parent_zs = np.array([p.z for p in self.parent.points])
+            parent_xs, parent_ys, parent_zs = self.parent.coords[:, :3].T
             
             self.parent._plot_projection(ax_xz, parent_xs, parent_zs, None, None, None, 
                                          parent_color, False, aspect_equal)
@@ -932,10 +957,10 @@ class NeuronSection(Section):
                 self._ref.connect(self.parent._ref(1))
         # Add 3D points to the section
         self._ref.pt3dclear()
-        for pt in self.points:
-            diam = 2*pt.r
+        for x, y, z, r in self.coords.tolist():
+            diam = 2*r
             diam = round(diam, 16)
-            self._ref.pt3dadd(pt.x, pt.y, pt.z, diam)
+            self._ref.pt3dadd(x, y, z, diam)
 
 
 
@@ -959,10 +984,10 @@ class SectionTree(Tree):
     """
 
     def __init__(self, sections: list[Section]) -> None:
-        super().__init__(sections)
-        # self._create_domains()
         self._point_tree = None
         self._seg_tree = None
+        super().__init__(sections)
+        # self._create_domains()
 
 
     def __repr__(self):
@@ -1039,13 +1064,14 @@ class SectionTree(Tree):
 
         for sec in self.sections:
             points = sec.points if sec.is_root or sec.parent.is_root else sec.points[1:]
-            for pt in points:
+            coords = get_coordinates(points).tolist()
+            for pt, (x, y, z, r) in zip(points, coords):
                 data['idx'].append(pt.idx)
                 data['domain'].append(pt.domain_name)
-                data['x'].append(pt.x)
-                data['y'].append(pt.y)
-                data['z'].append(pt.z)
-                data['r'].append(pt.r)
+                data['x'].append(x)
+                data['y'].append(y)
+                data['z'].append(z)
+                data['r'].append(r)
                 data['parent_idx'].append(pt.parent_idx)
                 data['section_idx'].append(sec.idx)
                 data['parent_section_idx'].append(sec.parent_idx)
@@ -1053,6 +1079,258 @@ class SectionTree(Tree):
         return pd.DataFrame(data)
 
 
+    # PATH DISTANCES
+
+    @cached_property
+    def _path_distance_offsets(self):
+        """
+        Path distances from the start of each section to the root and 
+        to the root of its domain, computed in a single traversal
+        of the tree.
+
+        Returns
+        -------
+        tuple
+            A mapping from sections to their positions in the tree and 
+            three arrays of section lengths, distances to the root 
+            and distances to the domain root.
+        """
+        positions = {sec: i for i, sec in enumerate(self.sections)}
+        lengths = np.array([sec.length for sec in self.sections], dtype=float)
+        to_root = np.zeros(len(self.sections))
+        to_domain_root = np.zeros(len(self.sections))
+
+        # Parents are visited before their children
+        for sec in self.traverse():
+            parent = sec.parent
+            if parent is None or parent.is_root:
+                continue
+            i, j = positions[sec], positions[parent]
+            to_root[i] = to_root[j] + lengths[j]
+            if parent.domain_name == sec.domain_name:
+                to_domain_root[i] = to_domain_root[j] + lengths[j]
+
+        return positions, lengths, to_root, to_domain_root
+
+
+    def path_distances(self, relative_position=0, within_domain=False):
+        """
+        Path distances of all sections at a given relative position.
+
+        Parameters
+        ----------
+        relative_position : float, optional
+            The position along the sections' normalized length [0, 1]. 
+            Default is 0.
+        within_domain : bool, optional
+            Whether to measure the distance to the root of the section's
+            domain instead of the root of the tree. Default is False.
+
+        Returns
+        -------
+        numpy.ndarray
+            The path distances, one per section in the order of self.sections.
+        """
+        if not (0 <= relative_position <= 1):
+            raise ValueError(f'relative_position must be in [0, 1], got {relative_position}')
+        positions, lengths, to_root, to_domain_root = self._path_distance_offsets
+        offsets = to_domain_root if within_domain else to_root
+        distances = offsets + relative_position * lengths
+        distances[positions[self.root]] = lengths[positions[self.root]] * abs(relative_position - 0.5)
+        return distances
+
+
+    # LOWEST COMMON ANCESTORS
+
+    @cached_property
+    def _lca_index(self):
+        """
+        Euler tour of the tree with a sparse table of the shallowest 
+        tour entries, used to find lowest common ancestors in O(1).
+
+        Returns
+        -------
+        tuple
+            The position of the first occurrence of each section in the tour,
+            the tour of section positions, the depths along the tour and
+            the sparse table of tour indices with the minimum depth.
+        """
+        positions = self._path_distance_offsets[0]
+
+        first = np.zeros(len(self.sections), dtype=int)
+        tour, depths = [positions[self.root]], [0]
+        stack = [(self.root, 0, iter(self.root.children))]
+        while stack:
+            sec, depth, children = stack[-1]
+            child = next(children, None)
+            if child is None:
+                stack.pop()
+                if stack:
+                    tour.append(positions[stack[-1][0]])
+                    depths.append(stack[-1][1])
+            else:
+                first[positions[child]] = len(tour)
+                tour.append(positions[child])
+                depths.append(depth + 1)
+                stack.append((child, depth + 1, iter(child.children)))
+
+        tour = np.array(tour, dtype=int)
+        depths = np.array(depths, dtype=int)
+
+        # table[k, i] is the tour index of the shallowest entry in [i, i + 2**k)
+        n = len(tour)
+        n_levels = max(1, int(n).bit_length())
+        table = np.zeros((n_levels, n), dtype=int)
+        table[0] = np.arange(n)
+        for k in range(1, n_levels):
+            half = 1 << (k - 1)
+            size = n - (1 << k) + 1
+            left = table[k - 1, :size]
+            right = table[k - 1, half:half + size]
+            table[k, :size] = np.where(depths[left] <= depths[right], left, right)
+
+        return first, tour, depths, table
+
+
+    def _lowest_common_ancestor_positions(self, pos_a, pos_b):
+        """
+        Positions of the lowest common ancestors for arrays 
+        of section positions (broadcasted against each other).
+        """
+        first, tour, depths, table = self._lca_index
+        start = np.minimum(first[pos_a], first[pos_b])
+        end = np.maximum(first[pos_a], first[pos_b])
+        level = np.log2(end - start + 1).astype(int)
+        left = table[level, start]
+        right = table[level, end - (1 << level) + 1]
+        return tour[np.where(depths[left] <= depths[right], left, right)]
+
+
+    def _has_lca_index_for(self, *sections):
+        positions = self._path_distance_offsets[0]
+        return all(sec in positions for sec in sections)
+
+
+    def lowest_common_ancestor(self, sec_a, sec_b):
+        """
+        Find the lowest common ancestor of two sections in O(1)
+        using the precomputed Euler tour of the tree.
+
+        Parameters
+        ----------
+        sec_a : Section
+            The first section.
+        sec_b : Section
+            The second section.
+
+        Returns
+        -------
+        Section
+            The lowest common ancestor of the two sections.
+        """
+        positions = self._path_distance_offsets[0]
+        first, tour, depths, table = self._lca_index
+        start, end = sorted((first[positions[sec_a]], first[positions[sec_b]]))
+        level = int(end - start + 1).bit_length() - 1
+        left = table[level, start]
+        right = table[level, end - (1 << level) + 1]
+        best = left if depths[left] <= depths[right] else right
+        return self.sections[tour[best]]
+
+
+    def _path_length_between(self, sec_a, sec_b, common_ancestor):
+        """
+        Total length of the sections on the path between two sections, 
+        excluding both sections and their common ancestor.
+        """
+        positions, lengths, to_root, _ = self._path_distance_offsets
+        i = positions[common_ancestor]
+        ancestor_end = 0 if common_ancestor.is_root else to_root[i] + lengths[i]
+        path_length = 0
+        for sec in (sec_a, sec_b):
+            if sec is not common_ancestor:
+                path_length += to_root[positions[sec]] - ancestor_end
+        return float(path_length)
+
+
+    def pairwise_path_distances(self, secs_a, locs_a, secs_b, locs_b):
+        """
+        Path distances between all pairs of locations from two sets, 
+        consistent with Section.path_distance.
+
+        Parameters
+        ----------
+        secs_a : list[Section]
+            The sections of the first set of locations.
+        locs_a : list[float]
+            The relative positions along the sections of the first set.
+        secs_b : list[Section]
+            The sections of the second set of locations.
+        locs_b : list[float]
+            The relative positions along the sections of the second set.
+
+        Returns
+        -------
+        numpy.ndarray
+            A matrix of shape (len(secs_a), len(secs_b)) with the path 
+            distance between every pair of locations.
+        """
+        pos_a = self._get_positions(secs_a)[:, None]
+        pos_b = self._get_positions(secs_b)[None, :]
+        x_a = np.asarray(locs_a, dtype=float)[:, None]
+        x_b = np.asarray(locs_b, dtype=float)[None, :]
+        if np.any((x_a < 0) | (x_a > 1)) or np.any((x_b < 0) | (x_b > 1)):
+            raise ValueError('Relative positions must be in [0, 1].')
+
+        ancestors = self._lowest_common_ancestor_positions(pos_a, pos_b)
+        return self._path_distances_via_ancestors(pos_a, x_a, pos_b, x_b, ancestors)
+
+
+    def _get_positions(self, sections):
+        """
+        Positions of the given sections in the tree as an array.
+        """
+        positions = self._path_distance_offsets[0]
+        return np.array([positions[sec] for sec in sections], dtype=int)
+
+
+    def _path_distances_via_ancestors(self, pos_a, x_a, pos_b, x_b, ancestors):
+        """
+        Path distances between locations given the positions of their 
+        sections, their relative positions and the positions of the 
+        lowest common ancestors of the sections (all broadcastable).
+        """
+        positions, lengths, to_root, _ = self._path_distance_offsets
+        ends = to_root + lengths
+        ends[positions[self.root]] = 0
+
+        dist_a = to_root[pos_a] + x_a * lengths[pos_a]
+        dist_b = to_root[pos_b] + x_b * lengths[pos_b]
+
+        # Locations in parallel subtrees
+        distances = dist_a + dist_b - 2 * ends[ancestors]
+        # One section is an ancestor of the other
+        distances = np.where(ancestors == pos_a, 
+                             dist_b - ends[pos_a] + (1 - x_a) * lengths[pos_a], 
+                             distances)
+        distances = np.where(ancestors == pos_b, 
+                             dist_a - ends[pos_b] + (1 - x_b) * lengths[pos_b], 
+                             distances)
+        # Locations on the same section
+        distances = np.where(pos_a == pos_b, 
+                             np.abs(x_b - x_a) * lengths[pos_a], 
+                             distances)
+        return distances
+
+
+    def _invalidate_topology_cache(self):
+        """Call after modifying the topology of the tree to invalidate cached properties."""
+        self.__dict__.pop('_path_distance_offsets', None)
+        self.__dict__.pop('_lca_index', None)
+        if self._seg_tree is not None:
+            self._seg_tree._invalidate_topology_cache()
+
+
     # SORTING METHODS
 
     def sort(self, **kwargs):
@@ -1199,8 +1477,9 @@ class SectionTree(Tree):
             if focus_sections and sec not in focus_sections:
                 continue
 
-            xs = [getattr(pt, x_attr) for pt in sec.points]
-            ys = [getattr(pt, y_attr) for pt in sec.points]
+            coords = sec.coords
+            xs = coords[:, 'xyz'.index(x_attr)]
+            ys = coords[:, 'xyz'.index(y_attr)]
 
             # Assign colors based on domains or section index
             color = plt.cm.jet(1 - sec.idx / section_count)
@@ -2,6 +2,7 @@
 # SPDX-License-Identifier: MPL-2.0
 
 from dendrotweaks.morphology.trees import Node, Tree
+from functools import cached_property
 import numpy as np
 
 class Segment(Node):
@@ -185,4 +186,58 @@ class SegmentTree(Tree):
         """
         The segments in the segment tree. Alias for self._nodes
         """
-        return self._nodes
\ No newline at end of file
+        return self._nodes
+
+
+    # PATH DISTANCES
+
+    @cached_property
+    def _path_distances(self):
+        """
+        Path distances of all segments to the root and to the root 
+        of their domain, read from the offsets precomputed 
+        for the section tree.
+        """
+        sec_tree = self.root._section._tree
+        positions, lengths, to_root, to_domain_root = sec_tree._path_distance_offsets
+
+        sec_positions = np.array([positions[seg._section] for seg in self._nodes], dtype=int)
+        xs = np.array([seg.x for seg in self._nodes], dtype=float)
+
+        seg_lengths = lengths[sec_positions]
+        distances = to_root[sec_positions] + xs * seg_lengths
+        domain_distances = to_domain_root[sec_positions] + xs * seg_lengths
+
+        # The root section is measured from its center
+        is_root = sec_positions == positions[sec_tree.root]
+        root_distances = seg_lengths[is_root] * np.abs(xs[is_root] - 0.5)
+        distances[is_root] = root_distances
+        domain_distances[is_root] = root_distances
+
+        distances.flags.writeable = False
+        domain_distances.flags.writeable = False
+        return distances, domain_distances
+
+
+    def path_distances(self, within_domain=False):
+        """
+        Path distances of all segments.
+
+        Parameters
+        ----------
+        within_domain : bool, optional
+            Whether to measure the distance to the root of the segment's
+            domain instead of the root of the tree. Default is False.
+
+        Returns
+        -------
+        numpy.ndarray
+            The path distances, one per segment in the order of self.segments.
+        """
+        distances, domain_distances = self._path_distances
+        return domain_distances if within_domain else distances
+
+
+    def _invalidate_topology_cache(self):
+        """Call after modifying the topology of the tree to invalidate cached properties."""
+        self.__dict__.pop('_path_distances', None)
\ No newline at end of file
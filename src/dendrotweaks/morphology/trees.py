@@ -390,6 +390,12 @@ class Tree:
                 edges.append((node.parent, node))
         return edges
 
+    # CACHE METHODS
+
+    def _invalidate_topology_cache(self):
+        """Call after modifying the topology of the tree to invalidate cached properties."""
+        pass
+
     # TREE CONSTRUCTION METHODS
 
     def _find_root(self):
@@ -470,12 +476,18 @@ class Tree:
         of the node's children, ensuring that the shortest paths are traversed first.
         """
 
-        # subtree_size_map = {node: len(self.get_subtree(node)) for node in self._nodes}
+        # Count the bifurcations in each subtree in a single post-order pass
+        n_bifurcations = {}
+        for node in reversed(list(self.traverse())):
+            n_bifurcations[node] = (
+                int(len(node.children) > 1)
+                + sum(n_bifurcations[child] for child in node.children)
+            )
 
         for node in self._nodes:
             node.children = sorted(
                 node.children, 
-                key=lambda x: sum(1 for n in x.subtree if len(n.children) > 1),
+                key=lambda x: n_bifurcations[x],
                 reverse=False
             )
 
@@ -505,6 +517,7 @@ class Tree:
             count += 1
 
         self._nodes = sorted(self._nodes, key=lambda x: x.idx)
+        self._invalidate_topology_cache()
 
         if not self.is_sorted:
             raise ValueError('Tree is not sorted.')
@@ -528,13 +541,24 @@ class Tree:
         """
         if node.is_root:
             raise ValueError('Cannot remove the root node.')
+        self._detach_node(node)
+        self._nodes.remove(node)
+        self._invalidate_topology_cache()
+
+
+    @staticmethod
+    def _detach_node(node):
+        """
+        Detach a node from the tree, attaching its children to its parent.
+        Does not update the list of nodes of the tree.
+        """
         parent = node.parent
-        children = node.children[:]
-        for child in children:
-            child.disconnect_from_parent()
-            child.connect_to_parent(parent)
+        for child in node.children:
+            # Moving a child to its grandparent cannot create a loop
+            child.parent = parent
+            parent.children.append(child)
+        node.children = []
         node.disconnect_from_parent()
-        self._nodes.remove(node)
 
 
     def remove_subtree(self, node):
@@ -549,6 +573,7 @@ class Tree:
         node.disconnect_from_parent()
         for n in node.subtree:
             self._nodes.remove(n)
+        self._invalidate_topology_cache()
 
 
     def add_subtree(self, node, parent):
@@ -564,6 +589,7 @@ class Tree:
         """
         node.connect_to_parent(parent)
         self._nodes.extend(node.subtree)
+        self._invalidate_topology_cache()
 
 
     def insert_node_after(self, new_node, existing_node):
@@ -586,6 +612,7 @@ class Tree:
         new_node.connect_to_parent(existing_node)
 
         self._nodes.append(new_node)
+        self._invalidate_topology_cache()
 
 
     def insert_node_before(self, new_node, existing_node):
@@ -601,11 +628,24 @@ class Tree:
         """
         if new_node in self._nodes:
             raise ValueError('Node already exists in the tree.')
-        new_node.connect_to_parent(existing_node.parent)
-        existing_node.disconnect_from_parent()
-        existing_node.connect_to_parent(new_node)
-        
+        self._attach_node_before(new_node, existing_node)
         self._nodes.append(new_node)
+        self._invalidate_topology_cache()
+
+
+    @staticmethod
+    def _attach_node_before(new_node, existing_node):
+        """
+        Attach a new node between an existing node and its parent.
+        Does not update the list of nodes of the tree.
+        """
+        parent = existing_node.parent
+        new_node.parent = parent
+        parent.children.append(new_node)
+        existing_node.disconnect_from_parent()
+        # The new node has no other children, so this cannot create a loop
+        existing_node.parent = new_node
+        new_node.children.append(existing_node)
 
 
     def reposition_subtree(self, node, new_parent_node, origin=None):
@@ -33,6 +33,10 @@ class prerun:
                 'end': end
             })
 
+        # Do not record the prerun period
+        if self.truncate:
+            self.model.simulator._recording_onset = self.duration
+
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
@@ -45,20 +49,8 @@ class prerun:
         for pop_name, (start, end) in self._original_input_params.items():
             self.model.populations[pop_name].update_input_params(**{'start': start, 'end': end})
     
-        duration_timepoints = int(self.duration / self.model.simulator.dt)
-        if len(self.model.simulator.t) > duration_timepoints and self.truncate:
-            self._truncate()
-        
-    def _truncate(self):
-        """Truncate the simulation time and recordings to the specified duration."""
-
-        onset = int(self.duration / self.model.simulator.dt)
-
-        self.model.simulator.t = self.model.simulator.t[onset:]
-        self.model.simulator.t = [t - self.duration for t in self.model.simulator.t]
-
-        for var, recs in self.model.recordings.items():
-            for seg, rec in recs.items():
-                recs[seg] = rec[onset:]
-
-        self.model.simulator._duration -= self.duration
\ No newline at end of file
+        simulator = self.model.simulator
+        if self.truncate:
+            simulator._recording_onset = 0
+            if exc_type is None:
+                simulator._duration -= self.duration
@@ -1,6 +1,7 @@
 # SPDX-FileCopyrightText: 2025 Poirazi Lab <dendrotweaks@dendrites.gr>
 # SPDX-License-Identifier: MPL-2.0
 
+import os
 from collections import defaultdict
 import warnings
 from functools import cached_property
@@ -17,6 +18,36 @@ import numpy as np
 
 import contextlib
 
+# Sampling interval and time window of a recording made at every time step
+DEFAULT_WINDOW = (None, None, None)
+
+
+def _count_steps(sampling_range):
+    """
+    Count the time steps in a sampling range (first, last, stride).
+    """
+    first, last, stride = sampling_range
+    return max(0, (last - first) // stride + 1)
+
+
+def _write_chunk(out, values, sampling_range, first_step):
+    """
+    Write the values recorded at every time step of a chunk starting 
+    at `first_step` that fall in the sampling range to the output array.
+    """
+    first, last, stride = sampling_range
+    chunk_first = max(first, first_step)
+    chunk_last = min(last, first_step + len(values) - 1)
+    # Index of the first sample of the range within the chunk
+    k_first = -(-(chunk_first - first) // stride)
+    k_last = (chunk_last - first) // stride
+    if k_last < k_first:
+        return
+    start = first + k_first * stride - first_step
+    stop = first + k_last * stride - first_step + 1
+    out[k_first:k_last + 1] = values[start:stop:stride]
+
+
 @contextlib.contextmanager
 def push_section(section):
     section.push()
@@ -123,30 +154,89 @@ class NeuronSimulator(Simulator):
         self.dt = dt
         self._cvode = cvode
 
+        # Sampling interval and time window of each recording {var: {seg: (dt, start, stop)}}
+        self._recording_windows = {}
+        # Time from which the recordings start (e.g. the end of a prerun)
+        self._recording_onset = 0
+        self._time_offset = 0
+        self._sampled_recordings = {}
+        self._sampling_ranges = {}
+        # Time points of each window recorded with cvode {window: times}
+        self._sampling_times = {}
+
+        # Simulation state saved at a checkpoint time (see `run`)
+        self._checkpoint = None
+
+    @cached_property
+    def recording_matrices(self):
+        """
+        The recorded traces as 2D arrays of shape (n_recordings, n_timepoints),
+        one per variable. The rows follow the order of `recordings[var]`.
+        Traces shorter than the longest one (e.g. recordings with a custom
+        sampling interval or time window) are padded with NaN.
+
+        The traces are copied once from the NEURON vectors into a
+        preallocated array, so they remain valid after subsequent runs.
+        """
+        matrices = {}
+        for var, recs in self._recordings.items():
+            vecs = [vec.as_numpy() for vec in recs.values()]
+            n_timepoints = max((len(vec) for vec in vecs), default=0)
+            matrix = np.full((len(vecs), n_timepoints), np.nan)
+            for row, vec in zip(matrix, vecs):
+                row[:len(vec)] = vec
+            matrices[var] = matrix
+        return matrices
+
     @cached_property
     def recordings(self):
+        """
+        The recorded traces as {var: {segment: trace}}, where each trace
+        is a row view into the corresponding `recording_matrices[var]`.
+        """
         return {
-            var:{ seg: vec.to_python() for seg, vec in recs.items() }
+            var: {
+                seg: row[:len(vec)] 
+                for (seg, vec), row in zip(recs.items(), self.recording_matrices[var])
+            }
             for var, recs in self._recordings.items()
         }
 
+    @cached_property
+    def recording_times(self):
+        """
+        The time points of each recording as {var: {segment: times}}.
+        Recordings without a custom sampling interval or time window 
+        share the simulation time vector `t`.
+        """
+        times = {}
+        for var, recs in self._recordings.items():
+            times[var] = {}
+            for seg in recs:
+                window = self._sampled_recordings.get((var, seg))
+                if window is None:
+                    times[var][seg] = self.t
+                else:
+                    n_timepoints = len(self.recordings[var][seg])
+                    times[var][seg] = self._get_sampling_times(window)[:n_timepoints]
+        return times
+
     @cached_property
     def t(self):
-        return self._t.to_python()
+        if self._t is None:
+            # Only the time points after the recording onset were recorded
+            return self._get_sampling_times(DEFAULT_WINDOW)
+        return self._t.as_numpy() - self._time_offset
 
     def _clean_cache(self):
         """
         Clean the cache of the simulator.
         """
-        try:
-            del self.recordings
-            del self.t
-        except AttributeError:
-            # Property hasn't been accessed yet, so no need to delete
-            pass
+        for attr in ('recording_matrices', 'recordings', 'recording_times', 't'):
+            self.__dict__.pop(attr, None)
 
 
-    def add_recording(self, sec, loc, var='v'):
+    def add_recording(self, sec, loc, var='v', dt=None, start=None, stop=None):
         """
         Add a recording to the simulator.
 
@@ -158,15 +248,28 @@ class NeuronSimulator(Simulator):
             The location along the normalized section length to record from.
         var : str
             The variable to record. Default is 'v' (voltage).
+        dt : float, optional
+            The sampling interval of the recording in ms, rounded to a multiple
+            of the simulation time step. Default is None (every time step).
+        start : float, optional
+            The time to start recording in ms. Default is None (from the beginning).
+        stop : float, optional
+            The time to stop recording in ms. Default is None (until the end).
         """
         seg = sec(loc)
         if not hasattr(seg._ref, f'_ref_{var}'):
             raise ValueError(f'Segment {seg} does not have variable {var}.')
+        if dt is not None and dt <= 0:
+            raise ValueError('Sampling interval must be positive.')
+        if start is not None and stop is not None and stop < start:
+            raise ValueError('Recording stop time must not precede its start time.')
         if self._recordings.get(var, {}).get(seg):
             self.remove_recording(sec, loc, var)
         if var not in self._recordings:
             self._recordings[var] = {}
         self._recordings[var][seg] = h.Vector().record(getattr(seg._ref, f'_ref_{var}'))
+        if (dt, start, stop) != DEFAULT_WINDOW:
+            self._recording_windows.setdefault(var, {})[seg] = (dt, start, stop)
         self._clean_cache()
 
     def remove_recording(self, sec, loc, var='v'):
@@ -184,8 +287,10 @@ class NeuronSimulator(Simulator):
         if seg in self._recordings[var]:
             self._recordings[var][seg] = None
             self._recordings[var].pop(seg)
+            self._recording_windows.get(var, {}).pop(seg, None)
             if not self._recordings[var]:
                 self._recordings.pop(var)
+                self._recording_windows.pop(var, None)
         self._clean_cache()
 
     def remove_all_recordings(self, var=None):
@@ -200,7 +305,34 @@ class NeuronSimulator(Simulator):
                 warnings.warn(f'Not all recordings were removed for variable {variable}: {self._recordings}')
 
 
-    def _init_simulation(self):
+    def _remap_recordings(self, seg_map):
+        """
+        Move the recordings to other segments, e.g. after the number
+        of segments in some sections has changed. The order of the
+        recordings is preserved.
+
+        Parameters
+        ----------
+        seg_map : dict
+            A dictionary mapping the old segments to the new ones.
+            Recordings on other segments are left unchanged.
+        """
+        for var, recs in self._recordings.items():
+            self._recordings[var] = {
+                seg_map.get(seg, seg): vec for seg, vec in recs.items()
+            }
+        for var, windows in self._recording_windows.items():
+            self._recording_windows[var] = {
+                seg_map.get(seg, seg): window for seg, window in windows.items()
+            }
+        self._sampled_recordings = {
+            (var, seg_map.get(seg, seg)): window 
+            for (var, seg), window in self._sampled_recordings.items()
+        }
+        self._clean_cache()
+
+
+    def _init_simulation(self, checkpoint_time=None):
 
         h.celsius = self.temperature
 
@@ -219,8 +351,128 @@ class NeuronSimulator(Simulator):
 
         h.frecord_init()
 
+        if checkpoint_time is not None:
+            self._advance_to_checkpoint(checkpoint_time)
 
-    def run(self, duration=300):
+
+    def _advance_to_checkpoint(self, checkpoint_time):
+        """
+        Advance the initialized simulation to the checkpoint time, either 
+        by restoring the state saved at this time in a previous run with the
+        same settings, or by integrating up to it and saving the state.
+        """
+        key = (checkpoint_time, self.dt, self.temperature, self.v_init, self._cvode)
+
+        if self._checkpoint is not None and self._checkpoint[0] == key:
+            # Keep the events queued by finitialize (stimuli and recordings)
+            # and the current NetCon weights
+            self._checkpoint[1].restore(1)
+            if self._cvode:
+                h.cvode.re_init()
+            h.frecord_init()
+            return
+
+        h.continuerun(checkpoint_time * ms)
+        state = h.SaveState()
+        state.save()
+        self._checkpoint = (key, state)
+
+
+    def clear_checkpoint(self):
+        """
+        Discard the simulation state saved at the checkpoint time (see `run`).
+        """
+        self._checkpoint = None
+
+
+    def _get_sampling_range(self, duration, dt=None, start=None, stop=None):
+        """
+        Get the first and last time steps and the stride to record at
+        for a sampling interval and a time window relative to the recording onset.
+        """
+        onset = self._recording_onset
+        step = self.dt
+        stride = max(1, int(round(dt / step))) if dt is not None else 1
+        first = int(round((onset + (start or 0)) / step))
+        last = int(round(duration / step))
+        if stop is not None:
+            last = min(last, int(round((onset + stop) / step)))
+        return first, last, stride
+
+
+    def _get_sampling_times(self, window):
+        """
+        Get the time points recorded with the given window in the last run.
+        """
+        if window in self._sampling_times:
+            return self._sampling_times[window]
+        first, last, stride = self._sampling_ranges[window]
+        return np.arange(first, last + 1, stride) * self.dt - self._time_offset
+
+
+    def _setup_recordings(self, duration, every_step=False):
+        """
+        Re-create the recording vectors for the next run. 
+        
+        Recordings with a custom sampling interval or time window, and all 
+        recordings when the recording onset is set, record only at the 
+        requested time steps, unless `every_step` is True.
+
+        With cvode, the time steps are not known in advance, so all
+        recordings are made at every time step and trimmed after the run
+        (see `_trim_recordings`).
+        """
+        self._time_offset = self._recording_onset
+        self._sampled_recordings = {}
+        self._sampling_ranges = {}
+        self._sampling_times = {}
+        # NEURON does not keep a reference to the time vectors
+        self._tvecs = {}
+
+        def get_tvec(window):
+            if window not in self._tvecs:
+                first, last, stride = self._sampling_ranges[window]
+                # Shift the events by a fraction of the time step so that
+                # the last time step is recorded despite round-off in t
+                self._tvecs[window] = h.Vector(
+                    (np.arange(first, last + 1, stride) - 0.25) * self.dt
+                )
+            return self._tvecs[window]
+
+        windows = [DEFAULT_WINDOW] + [
+            window for var_windows in self._recording_windows.values()
+            for window in var_windows.values()
+        ]
+        for window in windows:
+            if window not in self._sampling_ranges:
+                self._sampling_ranges[window] = self._get_sampling_range(duration, *window)
+
+        if self._cvode:
+            if any(window[0] is not None for window in windows):
+                raise ValueError('A sampling interval requires a fixed time step (cvode=False).')
+            every_step = True
+
+        if self._recording_onset and not every_step:
+            self._t = None
+        else:
+            self._t = h.Vector().record(h._ref_t)
+
+        for var, recs in self._recordings.items():
+            var_windows = self._recording_windows.get(var, {})
+            for seg, vec in recs.items():
+                window = var_windows.get(seg, DEFAULT_WINDOW)
+                ref = getattr(seg._ref, f'_ref_{var}')
+                vec.play_remove()
+                if every_step or (window == DEFAULT_WINDOW and not self._recording_onset):
+                    recs[seg] = h.Vector().record(ref)
+                else:
+                    recs[seg] = h.Vector().record(ref, get_tvec(window))
+                if window != DEFAULT_WINDOW:
+                    self._sampled_recordings[(var, seg)] = window
+
+
+    def run(self, duration=300, path_to_stream=None, chunk_duration=1000, 
+            checkpoint_time=None):
         """
         Run a simulation.
 
@@ -228,17 +480,140 @@ class NeuronSimulator(Simulator):
         ----------
         duration : float
             The duration of the simulation in milliseconds.
+        checkpoint_time : float, optional
+            If given, the state of the simulation at this time is saved with 
+            NEURON's SaveState and restored in subsequent runs with the same
+            checkpoint time, time step, temperature and initial voltage, instead 
+            of integrating up to it again. Only the recordings after the 
+            checkpoint (see `_recording_onset`) are valid when the state is 
+            restored. The checkpoint assumes that nothing before the checkpoint 
+            time changes between runs; call `clear_checkpoint` otherwise.
+            Default is None (always integrate from the beginning).
+        path_to_stream : str, optional
+            The directory to stream the recordings to. If given, the simulation
+            runs in chunks and the recorded traces are written to NPY files
+            after each chunk (see `_run_streamed`). Default is None (keep in memory).
+        chunk_duration : float, optional
+            The duration of each chunk in milliseconds when streaming. Default is 1000.
         """
 
         self._clean_cache()
 
         self._duration = duration
 
-        self._t = h.Vector().record(h._ref_t)
+        if checkpoint_time is not None and checkpoint_time > self._recording_onset:
+            raise ValueError('The checkpoint time must not exceed the recording onset.')
 
-        self._init_simulation()
+        if path_to_stream is not None:
+            self._run_streamed(duration, path_to_stream, chunk_duration, checkpoint_time)
+            return
+
+        self._setup_recordings(duration)
+
+        self._init_simulation(checkpoint_time)
 
         h.continuerun(duration * ms)
+
+        if self._cvode:
+            self._trim_recordings()
+
+
+    def _trim_recordings(self):
+        """
+        Keep only the samples recorded with cvode after the recording onset
+        and within the time window of each recording.
+        """
+        t = self._t.as_numpy().copy()
+        onset = self._recording_onset
+        # Tolerate round-off in t at the boundaries of the windows
+        tol = 1e-9
+        masks = {}
+        for window in self._sampling_ranges:
+            _, start, stop = window
+            mask = t >= onset + (start or 0) - tol
+            if stop is not None:
+                mask &= t <= onset + stop + tol
+            masks[window] = mask
+            self._sampling_times[window] = t[mask] - self._time_offset
+
+        var_windows = self._recording_windows
+        for var, recs in self._recordings.items():
+            for seg, vec in recs.items():
+                window = var_windows.get(var, {}).get(seg, DEFAULT_WINDOW)
+                recs[seg] = h.Vector(vec.as_numpy()[masks[window]])
+        self._t = h.Vector(t[masks[DEFAULT_WINDOW]])
+
+
+    def _run_streamed(self, duration, path_to_dir, chunk_duration, checkpoint_time=None):
+        """
+        Run the simulation in chunks and write the recorded traces to disk.
+
+        All variables are recorded at every time step into vectors that are
+        emptied after each chunk, and only the samples requested by each 
+        recording are written to the files, so the memory use does not 
+        grow with the duration of the simulation.
+
+        The time vector is written to `t.npy` and the traces of each variable
+        to `<var>.npy` with shape (n_recordings, n_timepoints). After the run,
+        `t`, `recording_matrices` and `recordings` are memory-mapped arrays.
+        """
+        if self._cvode:
+            raise ValueError('Streaming requires a fixed time step (cvode=False).')
+        if chunk_duration <= 0:
+            raise ValueError('Chunk duration must be positive.')
+
+        os.makedirs(path_to_dir, exist_ok=True)
+
+        self._setup_recordings(duration, every_step=True)
+
+        def open_output(name, shape):
+            path_to_file = os.path.join(path_to_dir, f'{name}.npy')
+            return np.lib.format.open_memmap(path_to_file, mode='w+', dtype=float, shape=shape)
+
+        t_out = open_output('t', (_count_steps(self._sampling_ranges[DEFAULT_WINDOW]),))
+        outputs = {}
+        for var, recs in self._recordings.items():
+            var_windows = self._recording_windows.get(var, {})
+            ranges = [self._sampling_ranges[var_windows.get(seg, DEFAULT_WINDOW)] for seg in recs]
+            lengths = [_count_steps(sampling_range) for sampling_range in ranges]
+            matrix = open_output(var, (len(recs), max(lengths, default=0)))
+            for row, n_timepoints in zip(matrix, lengths):
+                row[n_timepoints:] = np.nan
+            outputs[var] = (matrix, ranges, lengths)
+
+        self._init_simulation(checkpoint_time)
+
+        # The first recorded step (later than 0 if the state was restored)
+        first_step = int(round(h.t / self.dt)) - len(self._t) + 1
+        chunk_ends = list(np.arange(chunk_duration, duration, chunk_duration)) + [duration]
+        for chunk_end in chunk_ends:
+            h.continuerun(chunk_end * ms)
+
+            n_steps = len(self._t)
+            _write_chunk(t_out, self._t.as_numpy() - self._time_offset, 
+                         self._sampling_ranges[DEFAULT_WINDOW], first_step)
+            self._t.resize(0)
+
+            for var, recs in self._recordings.items():
+                matrix, ranges, _ = outputs[var]
+                for row, vec, sampling_range in zip(matrix, recs.values(), ranges):
+                    _write_chunk(row, vec.as_numpy(), sampling_range, first_step)
+                    vec.resize(0)
+
+            first_step += n_steps
+
+        t_out.flush()
+        self.t = np.load(os.path.join(path_to_dir, 't.npy'), mmap_mode='r')
+        self.recording_matrices = {}
+        self.recordings = {}
+        for var, (matrix, _, lengths) in outputs.items():
+            matrix.flush()
+            matrix = np.load(os.path.join(path_to_dir, f'{var}.npy'), mmap_mode='r')
+            self.recording_matrices[var] = matrix
+            self.recordings[var] = {
+                seg: row[:n_timepoints]
+                for seg, row, n_timepoints in zip(self._recordings[var], matrix, lengths)
+            }
     
 
     def to_dict(self):
@@ -2,7 +2,7 @@
 # SPDX-License-Identifier: MPL-2.0
 
 from dendrotweaks.morphology.seg_trees import Segment
-from dendrotweaks.stimuli.synapses import Synapse
+from dendrotweaks.stimuli.synapses import Synapse, create_spike_trains
 
 from collections import defaultdict
 
@@ -88,7 +88,6 @@ class Population():
         self.name = name
         self.segments = segments
         self.sections = list(set([seg._section for seg in segments]))
-        self._excluded_segments = [seg for sec in self.sections for seg in sec if seg not in segments]
         self.syn_type = syn_type
 
         self.N = N
@@ -151,11 +150,16 @@ class Population():
             - mu: the sensitivity of the magnesium block to Mg2+ concentration (NMDA only)
         """
         self.kinetic_params.update(params)
-        for syns in self.synapses.values():
-            for syn in syns:
-                for key, value in params.items():
-                    if hasattr(syn._ref_syn, key):
-                        setattr(syn._ref_syn, key, value)
+        ref_syns = [syn._ref_syn for syns in self.synapses.values() for syn in syns]
+        if not ref_syns:
+            return
+        # All synapses share the same point process, so the 
+        # valid parameters are checked once for the population
+        params = [(key, value) for key, value in params.items() 
+                  if hasattr(ref_syns[0], key)]
+        for ref_syn in ref_syns:
+            for key, value in params:
+                setattr(ref_syn, key, value)
 
     def update_input_params(self, **params):
         """
@@ -172,78 +176,184 @@ class Population():
             - end: the end time of the input
             - weight: the weight of the synapse
             - delay: the delay of the synapse
+            - seed: the seed of the spike trains
+
+        If only the start and end times change by the same amount,
+        the existing spike trains are shifted instead of being recreated.
         """
+        shift = self._get_input_shift(**params)
         self.input_params.update(params)
-        self.create_inputs()
+        if shift is None:
+            self.create_inputs()
+        elif shift != 0:
+            for syns in self.synapses.values():
+                for syn in syns:
+                    syn.shift_spike_times(shift)
+
+
+    def _get_input_shift(self, **params):
+        """
+        Return the time shift of the inputs if the parameters only move 
+        the start and end times by the same amount, otherwise None.
+        """
+        if not params or set(params) - {'start', 'end'}:
+            return None
+        start_shift = params.get('start', self.input_params['start']) - self.input_params['start']
+        end_shift = params.get('end', self.input_params['end']) - self.input_params['end']
+        if start_shift != end_shift:
+            return None
+        if any(syn._ref_stim is None for syns in self.synapses.values() for syn in syns):
+            return None
+        return start_shift
 
     # ALLOCATION METHODS
 
-    def _choose_synapse_locations(self):
-        
-        valid_locs = [(sec, x) for sec in self.sections 
-            for x in np.linspace(0, 1, 1001) 
-            if sec(x) not in self._excluded_segments]
-        
-        syn_locs = [valid_locs[np.random.choice(len(valid_locs))] for _ in range(self.N)]
-        sorted_syn_locs = sorted(syn_locs, key=lambda pair: (pair[0].idx, pair[1]))
-        
-        return sorted_syn_locs
+    def _choose_synapse_locations(self, seed=None, weights='length'):
+        """
+        Randomly choose the locations of the synapses.
 
+        The segment of each synapse is drawn with a probability proportional 
+        to its length (or surface area), and the location is drawn uniformly
+        within the segment. All locations are sampled at once.
 
-    def allocate_synapses(self, syn_locs=None):
+        Parameters
+        ----------
+        seed : int or np.random.Generator, optional
+            The seed or the random number generator to use.
+            Default is None (unseeded).
+        weights : str, optional
+            The weights of the segments, either 'length' or 'area'.
+            Default is 'length'.
+
+        Returns
+        -------
+        List[Tuple[Section, float]]
+            The synapse locations as (section, location) pairs
+            sorted by section index and location.
+        """
+        if weights not in ('length', 'area'):
+            raise ValueError(f"Invalid weights '{weights}'. Use 'length' or 'area'.")
+        rng = np.random.default_rng(seed)
+
+        sections = sorted(self.sections, key=lambda sec: sec.idx)
+        segments = set(self.segments)
+
+        sec_positions, seg_starts, seg_widths, seg_weights = [], [], [], []
+        for i, sec in enumerate(sections):
+            nseg = len(sec.segments)
+            for j, seg in enumerate(sec.segments):
+                if seg not in segments:
+                    continue
+                sec_positions.append(i)
+                seg_starts.append(j / nseg)
+                seg_widths.append(1 / nseg)
+                seg_weights.append(sec.L / nseg if weights == 'length' else seg.area)
+
+        seg_weights = np.asarray(seg_weights, dtype=float)
+        if seg_weights.sum() <= 0:
+            raise ValueError(f'No segments to place the synapses of population {self.name} on.')
+
+        chosen = rng.choice(len(seg_weights), size=self.N, p=seg_weights / seg_weights.sum())
+        sec_positions = np.asarray(sec_positions)[chosen]
+        locs = np.asarray(seg_starts)[chosen] + rng.random(self.N) * np.asarray(seg_widths)[chosen]
 
+        order = np.lexsort((locs, sec_positions))
+        return [(sections[i], x) for i, x in zip(sec_positions[order].tolist(), locs[order].tolist())]
+
+
+    def allocate_synapses(self, syn_locs=None, seed=None, weights='length'):
+        """
+        Create the synapses of the population in the simulator.
+
+        Parameters
+        ----------
+        syn_locs : List[Tuple[Section, float]], optional
+            The synapse locations as (section, location) pairs.
+            Default is None (the locations are chosen randomly).
+        seed : int or np.random.Generator, optional
+            The seed or the random number generator used to choose
+            the locations. Default is None (unseeded).
+        weights : str, optional
+            Whether to choose the locations in proportion to the 'length'
+            or the 'area' of the segments. Default is 'length'.
+        """
         if syn_locs is None:
-            syn_locs = self._choose_synapse_locations()
+            syn_locs = self._choose_synapse_locations(seed=seed, weights=weights)
         syn_type = self.syn_type
+
         self.synapses = {(sec, x) : [] for sec, x in syn_locs}
         for sec, x in syn_locs:
             self.synapses[(sec, x)].append(Synapse(syn_type, sec, x))
 
         self.update_kinetic_params(**self.kinetic_params)
-            
-
-
-    # CREATION METHODS
-
-    def _generate_synapse_seeds(self):
-        """
-        Generate unique seeds for each synapse in the population.
-        """
-        pop_seed = self.input_params['seed']
 
-        if pop_seed is not None:
-            ss = np.random.SeedSequence(pop_seed)
-            child_seeds = ss.spawn(self.N)
-            seed_iter = iter(int(seed.generate_state(1)[0]) for seed in child_seeds)
-        else:
-            seed_iter = iter([None] * self.N)
 
-        return seed_iter
 
+    # CREATION METHODS
 
     def create_inputs(self):
         """
         Create and reference the synapses in a simulator.
         
         This method should be called after the synapses have been allocated.
+        The spike trains of all synapses are generated at once. Existing
+        stimuli and connections are updated in place rather than recreated.
         """
-        seed_iter = self._generate_synapse_seeds()
+        synapses = [syn for syns in self.synapses.values() for syn in syns]
+
+        spike_times, offsets = create_spike_trains(
+            len(synapses),
+            rate=self.input_params['rate'],
+            noise=self.input_params['noise'],
+            duration=self.input_params['end'] - self.input_params['start'],
+            delay=self.input_params['start'],
+            seed=self.input_params['seed']
+        )
 
-        for syns in self.synapses.values():
-            for syn in syns:
+        delay = self.input_params['delay']
+        weight = self.input_params['weight']
+        for syn, start, end in zip(synapses, offsets[:-1].tolist(), offsets[1:].tolist()):
+            syn.set_spike_times(spike_times[start:end])
+            syn.set_con(delay=delay, weight=weight)
+
+
+    def _update_segmentation(self, old_segments):
+        """
+        Update the population after the number of segments
+        in some of its sections has changed.
+
+        The synapses on these sections are moved to the new segments
+        at their locations. A new segment is a target of the population
+        if it overlaps any of the old target segments.
+
+        Parameters
+        ----------
+        old_segments : dict
+            A dictionary mapping each resegmented section to
+            its list of segments before the change.
+        """
+        target_segments = set(self.segments)
+        segments = []
+        updated_sections = set()
+        for seg in self.segments:
+            sec = seg._section
+            if sec not in old_segments:
+                segments.append(seg)
+            elif sec not in updated_sections:
+                updated_sections.add(sec)
+                old_segs = old_segments[sec]
+                n_old, n_new = len(old_segs), len(sec.segments)
+                for j, new_seg in enumerate(sec.segments):
+                    # The old segments overlapping [j / n_new, (j + 1) / n_new]
+                    overlapping = old_segs[j * n_old // n_new: ((j + 1) * n_old - 1) // n_new + 1]
+                    if any(old_seg in target_segments for old_seg in overlapping):
+                        segments.append(new_seg)
+        self.segments = segments
 
-                syn.create_stim(
-                    rate=self.input_params['rate'],
-                    noise=self.input_params['noise'],
-                    duration=self.input_params['end'] - self.input_params['start'],
-                    delay=self.input_params['start'],
-                    seed=next(seed_iter)
-                )
-
-                syn.create_con(
-                    delay=self.input_params['delay'],
-                    weight=self.input_params['weight']
-                )
+        for (sec, x), syns in self.synapses.items():
+            if sec in old_segments:
+                for syn in syns:
+                    syn._relocate()
 
 
     def to_dict(self):
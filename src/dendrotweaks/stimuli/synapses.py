@@ -6,6 +6,9 @@ from neuron import h
 import numpy as np
 from dendrotweaks.morphology.seg_trees import Segment
 
+# The maximum number of random values drawn at once by create_spike_trains
+MAX_DRAWS_PER_BLOCK = 2**20
+
 class Synapse():
     """
     A synapse object that can be placed on a section of a neuron.
@@ -37,8 +40,9 @@ class Synapse():
         self._Model = getattr(h, syn_type)
         self.sec = sec
         self.loc = loc
+        self._seg = sec(loc)
 
-        self._ref_syn = self._Model(self.seg._ref)
+        self._ref_syn = self._Model(self._seg._ref)
         self._ref_stim = None
         self._ref_con = None
 
@@ -47,11 +51,19 @@ class Synapse():
         """
         The segment on which the synapse is placed.
         """
-        return self.sec(self.loc)
+        return self._seg
 
     def __repr__(self):
         return f"<Synapse({self.sec}({self.loc:.3f}))>"
 
+    def _relocate(self):
+        """
+        Move the synapse (Model) object to the segment at its location,
+        e.g. after the number of segments in the section has changed.
+        """
+        self._seg = self.sec(self.loc)
+        self._ref_syn.loc(self._seg._ref)
+
     @property
     def spike_times(self):
         """
@@ -92,11 +104,38 @@ class Synapse():
             self._clear_stim()
 
         spike_times = create_spike_times(**kwargs)
-        spike_vec = h.Vector(spike_times)
-        stim = h.VecStim()
-        stim.play(spike_vec)
+        self.set_spike_times(spike_times)
+
+    def set_spike_times(self, spike_times):
+        """
+        Set the spike times played by the stimulus (VecStim) of the synapse.
 
-        self._ref_stim = [stim, spike_vec]
+        The stimulus is created if it does not exist, otherwise
+        the spike times of the existing stimulus are replaced.
+
+        Parameters
+        ----------
+        spike_times : np.array
+            The spike times, in ms.
+        """
+        if self._ref_stim is None:
+            spike_vec = h.Vector(spike_times)
+            stim = h.VecStim()
+            stim.play(spike_vec)
+            self._ref_stim = [stim, spike_vec]
+        else:
+            self._ref_stim[1].from_python(spike_times)
+
+    def shift_spike_times(self, shift):
+        """
+        Shift the spike times of the stimulus (VecStim) in place.
+
+        Parameters
+        ----------
+        shift : float
+            The time shift, in ms.
+        """
+        self._ref_stim[1].add(shift)
 
     def _clear_con(self):
         """
@@ -123,6 +162,24 @@ class Synapse():
                                  delay,
                                  weight)
 
+    def set_con(self, delay, weight):
+        """
+        Set the delay and weight of the connection (NetCon),
+        creating the connection if it does not exist.
+
+        Parameters
+        ----------
+        delay : int
+            The delay of the connection, in ms.
+        weight : float
+            The weight of the connection.
+        """
+        if self._ref_con is None:
+            self.create_con(delay, weight)
+        else:
+            self._ref_con.delay = delay
+            self._ref_con.weight[0] = weight
+
     def xyz(self):
         """
         Returns the 3D coordinates of the synapse location.
@@ -163,6 +220,74 @@ def create_spike_times(rate=1, noise=1, duration=300, delay=0, seed=None):
         return delay + generate_jittered_spikes(rate, duration, noise, seed)
 
 
+def create_spike_trains(n, rate=1, noise=1, duration=300, delay=0, seed=None):
+    """
+    Create the spike trains of n synapses sharing the same input parameters.
+
+    All trains are drawn at once from a single random number generator.
+    The i-th train uses the i-th block of the random stream, so it depends 
+    only on the seed and on i, not on the number of trains.
+
+    Parameters
+    ----------
+    n : int
+        The number of spike trains to create.
+    rate : float
+        The rate of the spike trains, in Hz.
+    noise : float
+        A parameter between 0 and 1 that controls the regularity of the spike trains. 
+        0 corresponds to regular spike trains. 1 corresponds to a Poisson process.
+    duration : int
+        The total time to run the simulation for, in ms.
+    delay : int
+        The delay of the spike trains, in ms.
+    seed : int or np.random.Generator, optional
+        The seed or the random number generator to use. Default is None (unseeded).
+
+    Returns
+    -------
+    Tuple[np.array, np.array]
+        The spike times of all trains concatenated, in ms, and the offsets
+        of the trains, so that the i-th train is spike_times[offsets[i]:offsets[i + 1]].
+    """
+    rng = np.random.default_rng(seed)
+    dur_s = duration / 1000
+
+    if noise == 1:
+        n_draws = int(rate * dur_s)
+    else:
+        regular_spike_times = np.arange(0, dur_s, 1/rate)
+        n_draws = len(regular_spike_times)
+
+    # Draw the trains in blocks to limit the memory use
+    block_size = max(1, MAX_DRAWS_PER_BLOCK // max(n_draws, 1))
+
+    spike_times, counts = [], []
+    for block_start in range(0, n, block_size):
+        n_block = min(block_size, n - block_start)
+
+        if noise == 1:
+            intervals = rng.exponential(1/rate, (n_block, n_draws))
+            block_spike_times = np.cumsum(intervals, axis=1)
+            valid = block_spike_times <= dur_s
+        else:
+            noise_values = rng.normal(0, noise/rate, (n_block, n_draws))
+            block_spike_times = regular_spike_times + noise_values
+            valid = (block_spike_times >= 0) & (block_spike_times <= dur_s)
+            # Move the spikes outside the duration to the end of each train
+            block_spike_times[~valid] = np.inf
+            block_spike_times.sort(axis=1)
+
+        block_counts = valid.sum(axis=1)
+        spike_times.append(block_spike_times[np.arange(n_draws) < block_counts[:, None]])
+        counts.append(block_counts)
+
+    spike_times = np.concatenate(spike_times) if spike_times else np.empty(0)
+    offsets = np.concatenate([[0], np.cumsum(np.concatenate(counts) if counts else [])])
+
+    return delay + spike_times * 1000, offsets.astype(int)
+
+
 def generate_poisson_process(lam, dur, seed=None):
     """
     Generate a Poisson process.
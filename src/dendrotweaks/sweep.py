@@ -0,0 +1,274 @@
+# SPDX-FileCopyrightText: 2025 Poirazi Lab <dendrotweaks@dendrites.gr>
+# SPDX-License-Identifier: MPL-2.0
+
+"""
+Helpers to run a model under several conditions in a pool of worker processes.
+
+Each worker rebuilds the model once from its serialized state
+(see `get_model_state`) and then runs the conditions it receives,
+restoring the original state of the model after each run.
+"""
+
+import os
+import contextlib
+
+from dendrotweaks.morphology.point_trees import Point, PointStore, PointTree
+
+DEFAULT_MECHANISMS = ['Leak', 'CaDyn', 'Independent']
+SIMULATOR_PARAMS = ['temperature', 'v_init']
+
+# The model rebuilt in the current worker process
+_worker_model = None
+
+
+# -----------------------------------------------------------------------
+# SERIALIZATION
+# -----------------------------------------------------------------------
+
+def get_model_state(model):
+    """
+    Serialize the model into a picklable dictionary that
+    can be used to rebuild it in another process.
+
+    Parameters
+    ----------
+    model : Model
+        The model to serialize.
+
+    Returns
+    -------
+    dict
+        The state of the model: the point tree, the mechanisms,
+        the biophysical configuration and the stimuli.
+    """
+    return {
+        'path_to_model': model.path_to_model,
+        'simulator_name': model.simulator_name,
+        'morphology_name': model.morphology_name,
+        'points': model.point_tree.df,
+        'mechanisms': [mech_name for mech_name in model.mechanisms
+                       if mech_name not in DEFAULT_MECHANISMS],
+        'biophys': model.to_dict(),
+        'stimuli': {
+            'data': model.stimuli_to_dict(),
+            'df_recordings': model._recordings_to_csv(),
+            'df_iclamps': model._iclamps_to_csv(),
+            'df_synapses': model._synapses_to_csv(),
+        },
+    }
+
+
+def build_model(state):
+    """
+    Rebuild a model from its serialized state.
+
+    Parameters
+    ----------
+    state : dict
+        The state of the model (see `get_model_state`).
+
+    Returns
+    -------
+    Model
+        The rebuilt model.
+    """
+    from dendrotweaks.model import Model
+
+    model = Model(state['path_to_model'], simulator_name=state['simulator_name'])
+    model.morphology_name = state['morphology_name']
+
+    model.add_default_mechanisms(recompile=False)
+    for mech_name in state['mechanisms']:
+        model.add_mechanism(mech_name, dir_name='mod', recompile=False)
+
+    # The points are already standardized, sorted and extended,
+    # so the trees are rebuilt exactly as they are in the original model
+    df = state['points']
+    store = PointStore(capacity=len(df))
+    rows = store.extend(
+        df[['x', 'y', 'z', 'r']].to_numpy(dtype=float),
+        df['type_idx'].to_numpy(dtype=int),
+        df['parent_idx'].to_numpy(dtype=int)
+    )
+    nodes = [
+        Point._from_row(store, row, idx, 
+                        domain_name=domain_name, domain_color=domain_color)
+        for row, idx, domain_name, domain_color in zip(
+            rows.tolist(), df['idx'].tolist(), 
+            df['domain_name'].tolist(), df['domain_color'].tolist())
+    ]
+    point_tree = PointTree(nodes)
+    point_tree._is_extended = True
+    model._build_morphology(point_tree, sort_children=False)
+
+    model.from_dict(state['biophys'])
+    model.stimuli_from_dict(**state['stimuli'])
+
+    return model
+
+
+# -----------------------------------------------------------------------
+# CONDITIONS
+# -----------------------------------------------------------------------
+
+def validate_condition(model, condition):
+    """
+    Check a condition against the model and replace the IClamp
+    segments with their positions in `model.iclamps` so that
+    the condition can be sent to a worker process.
+
+    Parameters
+    ----------
+    model : Model
+        The model to run the condition on.
+    condition : dict
+        The condition to validate. See `Model.sweep` for the format.
+
+    Returns
+    -------
+    dict
+        The picklable condition.
+    """
+    unknown_keys = set(condition) - {'params', 'iclamps', 'populations'}
+    if unknown_keys:
+        raise ValueError(
+            f"Unknown condition keys: {sorted(unknown_keys)}. "
+            "Use 'params', 'iclamps' or 'populations'."
+        )
+
+    for param_name in condition.get('params', {}):
+        if param_name not in model.params and param_name not in SIMULATOR_PARAMS:
+            raise ValueError(f"Parameter '{param_name}' is not in the model.")
+
+    for pop_name, pop_params in condition.get('populations', {}).items():
+        if pop_name not in model.populations:
+            raise ValueError(f"Population '{pop_name}' is not in the model.")
+        pop = model.populations[pop_name]
+        for key in pop_params:
+            if key not in pop.input_params and key not in pop.kinetic_params:
+                raise ValueError(f"Unknown parameter '{key}' for population '{pop_name}'.")
+
+    iclamp_segments = list(model.iclamps)
+    iclamps = {}
+    for seg, iclamp_params in condition.get('iclamps', {}).items():
+        if seg not in model.iclamps:
+            raise ValueError(f"There is no IClamp at segment {seg}.")
+        iclamps[iclamp_segments.index(seg)] = iclamp_params
+
+    return {
+        'params': dict(condition.get('params', {})),
+        'iclamps': iclamps,
+        'populations': dict(condition.get('populations', {})),
+    }
+
+
+def apply_condition(model, condition):
+    """
+    Apply a validated condition to the model.
+
+    Parameters
+    ----------
+    model : Model
+        The model to apply the condition to.
+    condition : dict
+        The condition returned by `validate_condition`.
+
+    Returns
+    -------
+    callable
+        A function that restores the state of the model
+        before the condition was applied.
+    """
+    iclamps = list(model.iclamps.values())
+
+    original_params = {
+        param_name: getattr(model.simulator, param_name)
+        if param_name in SIMULATOR_PARAMS else dict(model.params[param_name])
+        for param_name in condition['params']
+    }
+    original_iclamps = {
+        i: {attr: getattr(iclamps[i], attr) for attr in iclamp_params}
+        for i, iclamp_params in condition['iclamps'].items()
+    }
+    original_populations = {}
+    for pop_name, pop_params in condition['populations'].items():
+        pop = model.populations[pop_name]
+        original_populations[pop_name] = (
+            {k: pop.input_params[k] for k in pop_params if k not in pop.kinetic_params},
+            {k: pop.kinetic_params[k] for k in pop_params if k in pop.kinetic_params},
+        )
+
+    for param_name, value in condition['params'].items():
+        distr_params = value if isinstance(value, dict) else {'value': value}
+        model.set_param(param_name, **distr_params)
+
+    for i, iclamp_params in condition['iclamps'].items():
+        for attr, value in iclamp_params.items():
+            setattr(iclamps[i], attr, value)
+
+    for pop_name, (input_params, kinetic_params) in original_populations.items():
+        pop = model.populations[pop_name]
+        pop_params = condition['populations'][pop_name]
+        if kinetic_params:
+            pop.update_kinetic_params(**{k: pop_params[k] for k in kinetic_params})
+        if input_params:
+            pop.update_input_params(**{k: pop_params[k] for k in input_params})
+
+    def restore():
+        for param_name, original in original_params.items():
+            if param_name in SIMULATOR_PARAMS:
+                setattr(model.simulator, param_name, original)
+            else:
+                model.params[param_name] = original
+                model.distribute(param_name)
+        for i, iclamp_params in original_iclamps.items():
+            for attr, value in iclamp_params.items():
+                setattr(iclamps[i], attr, value)
+        for pop_name, (input_params, kinetic_params) in original_populations.items():
+            pop = model.populations[pop_name]
+            if kinetic_params:
+                pop.update_kinetic_params(**kinetic_params)
+            if input_params:
+                pop.update_input_params(**input_params)
+
+    return restore
+
+
+# -----------------------------------------------------------------------
+# WORKERS
+# -----------------------------------------------------------------------
+
+def init_worker(state):
+    """
+    Rebuild the model in a worker process.
+    """
+    global _worker_model
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        _worker_model = build_model(state)
+
+
+def run_condition(condition, duration, prerun_time):
+    """
+    Run the model rebuilt in the worker process under a condition.
+
+    Returns
+    -------
+    dict
+        The time vector and the recorded traces for each variable,
+        in the order of the recordings of the model.
+    """
+    model = _worker_model
+    restore = apply_condition(model, condition)
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            model.run(duration=duration, prerun_time=prerun_time, 
+                      reuse_prerun=prerun_time > 0)
+        return {
+            'time': model.simulator.t,
+            'recordings': {
+                var: list(recs.values())
+                for var, recs in model.simulator.recordings.items()
+            },
+        }
+    finally:
+        restore()
@@ -64,20 +64,13 @@ def calculate_lambda_f(distances, diameters, Ra=35.4, Cm=1, frequency=100):
     if len(distances) != len(diameters):
         raise ValueError("distances and diameters must have the same length")
     
-    # Initialize variables
-    lam = 0
+    distances = np.asarray(distances, dtype=float)
+    diameters = np.asarray(diameters, dtype=float)
     section_L = distances[-1]
     
-    # Calculate the contribution of each frustum
-    for i in range(1, len(distances)):
-        # Frustum length
-        frustum_length = distances[i] - distances[i-1]
-        # Average of diameters at endpoints
-        d1 = diameters[i-1]
-        d2 = diameters[i]
-        
-        # Add frustum contribution to lambda calculation
-        lam += frustum_length / np.sqrt(d1 + d2)
+    # Sum the contributions of the frusta
+    frustum_lengths = np.diff(distances)
+    lam = np.sum(frustum_lengths / np.sqrt(diameters[:-1] + diameters[1:]))
     
     # Apply the frequency-dependent factor
     lam *= np.sqrt(2) * 1e-5 * np.sqrt(4 * np.pi * frequency * Ra * Cm)
@@ -85,6 +78,48 @@ def calculate_lambda_f(distances, diameters, Ra=35.4, Cm=1, frequency=100):
     # Return section_L/lam (electrotonic length of the section)
     return section_L / lam
 
+
+def calculate_lambda_f_sections(coords, diameters, offsets, Ra=35.4, Cm=1, frequency=100):
+    """
+    Calculate the frequency-dependent length constant (lambda_f) of many sections at once.
+    Vectorized version of `calculate_lambda_f`.
+
+    Args:
+        coords (array): 3D coordinates of the points of all sections, concatenated section by section, shape (n_points, 3)
+        diameters (array): Corresponding diameters of the points in micrometers
+        offsets (array): Index of the first point of each section, followed by the total number of points
+        Ra (float/array): Axial resistance in ohm*cm, one value or one per section
+        Cm (float/array): Specific membrane capacitance in µF/cm², one value or one per section
+        frequency (float): Frequency in Hz
+
+    Returns:
+        np.ndarray: Lambda_f of each section in micrometers
+    """
+    coords = np.asarray(coords, dtype=float)
+    diameters = np.asarray(diameters, dtype=float)
+    offsets = np.asarray(offsets, dtype=int)
+
+    if np.any(np.diff(offsets) < 2):
+        raise ValueError("At least 2 points per section are required for 3D calculation")
+
+    if len(coords) != len(diameters):
+        raise ValueError("coords and diameters must have the same length")
+
+    # The i-th frustum joins the points i and i+1. The frusta 
+    # joining the last point of a section to the first point 
+    # of the next section are excluded from the sums
+    frustum_lengths = np.sqrt(np.sum(np.diff(coords, axis=0)**2, axis=1))
+    frustum_lengths[offsets[1:-1] - 1] = 0
+    contributions = frustum_lengths / np.sqrt(diameters[:-1] + diameters[1:])
+
+    section_L = np.add.reduceat(frustum_lengths, offsets[:-1])
+    lam = np.add.reduceat(contributions, offsets[:-1])
+
+    # Apply the frequency-dependent factor
+    lam *= np.sqrt(2) * 1e-5 * np.sqrt(4 * np.pi * frequency * np.asarray(Ra) * np.asarray(Cm))
+
+    return section_L / lam
+
 def dynamic_import(module_name, class_name):
     """
     Dynamically import a class from a module.